@@ -0,0 +1,134 @@
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+from generator import generate_puzzle
+from logic import *
+
+TRIALS = 3
+MAX_PEOPLE = 6
+DEPTH = 2
+
+# Puzzles checked over and over by --stress
+STRESS_PEOPLE = 5
+STRESS_PUZZLES = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the entailment backends on generated knights "
+                    "and knaves puzzles and check that they agree."
+    )
+    parser.add_argument("max_people", type=int, nargs="?", default=MAX_PEOPLE)
+    parser.add_argument("trials", type=int, nargs="?", default=TRIALS)
+    parser.add_argument("--statements", type=int, default=None,
+                        help="statements per puzzle (default: one per "
+                             "person)")
+    parser.add_argument("--depth", type=int, default=DEPTH,
+                        help="how deeply each statement's claims nest")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="largest pool for the parallel backend, "
+                             "doubling from 2 (default: one per CPU)")
+    parser.add_argument("--stress", type=int, metavar="RUNS", default=None,
+                        help="instead, check parallel_model_check against "
+                             "model_check on the same puzzles RUNS times")
+    args = parser.parse_args()
+    max_people, trials = args.max_people, args.trials
+    if args.stress is not None:
+        stress_parallel(args.stress)
+        return
+
+    with contextlib.ExitStack() as stack:
+        solvers = backends(stack, args.processes)
+        print(f"{'people':>6}  {'backend':<28}  {'seconds':>10}")
+        for people in range(1, max_people + 1):
+            timings = {name: 0 for name in solvers}
+            for trial in range(trials):
+                knowledge, symbols, _ = generate_puzzle(
+                    people=people, statements=args.statements or people,
+                    depth=args.depth, seed=trial
+                )
+                results = dict()
+                for name, solve in solvers.items():
+                    start = time.perf_counter()
+                    results[name] = solve(knowledge, symbols)
+                    timings[name] += time.perf_counter() - start
+
+                # Every backend has to agree on the solution
+                if len(set(map(tuple, results.values()))) != 1:
+                    sys.exit(f"Backends disagree on puzzle {people}/{trial}")
+
+            for name in solvers:
+                print(f"{people:>6}  {name:<28}  "
+                      f"{timings[name] / trials:>10.4f}")
+
+
+def backends(stack, max_processes=None):
+    """
+    Return a dictionary from backend name to a function that takes a
+    knowledge base and a list of symbols, and returns the list of
+    symbols entailed by the knowledge base.
+
+    Each parallel backend keeps one pool of processes for every query,
+    closed when `stack` (a contextlib.ExitStack) is, so its timings do
+    not include starting processes.
+    """
+    solvers = {
+        "model_check": lambda knowledge, symbols: [
+            symbol for symbol in symbols if model_check(knowledge, symbol)
+        ],
+        "count_models": lambda knowledge, symbols: [
+            symbol for symbol in symbols
+            if count_models(And(knowledge, Not(symbol))) == 0
+        ],
+        "enumerate_models": solve_by_enumeration,
+    }
+
+    # Measure how the parallel backend scales with the number of processes
+    processes = 2
+    while processes <= (max_processes or os.cpu_count() or 1):
+        checker = stack.enter_context(ParallelModelChecker(processes))
+        solvers[f"parallel_model_check ({processes})"] = (
+            lambda knowledge, symbols, checker=checker: [
+                symbol for symbol in symbols
+                if checker.check(knowledge, symbol)
+            ]
+        )
+        processes *= 2
+    return solvers
+
+
+def stress_parallel(runs, people=STRESS_PEOPLE, puzzles=STRESS_PUZZLES):
+    """
+    Check every symbol of the same generated puzzles with
+    `parallel_model_check` on two processes, `runs` times over, exiting
+    if it ever disagrees with `model_check`. Each check starts and stops
+    its own pool, often right after a shard finds a counter-model, which
+    is where shutting the pool down once hung.
+    """
+    cases = [generate_puzzle(people=people, statements=people, depth=2,
+                             seed=seed) for seed in range(puzzles)]
+    for run in range(runs):
+        start = time.perf_counter()
+        for seed, (knowledge, symbols, _) in enumerate(cases):
+            for symbol in symbols:
+                if (parallel_model_check(knowledge, symbol, processes=2)
+                        != model_check(knowledge, symbol)):
+                    sys.exit(f"parallel_model_check disagrees on puzzle "
+                             f"{seed}, {symbol}")
+        print(f"Run {run + 1}/{runs} agreed "
+              f"({time.perf_counter() - start:.1f}s)", flush=True)
+
+
+def solve_by_enumeration(knowledge, symbols):
+    """Return the symbols that are true in every model of the knowledge."""
+    names = set.union(*[symbol.symbols() for symbol in symbols])
+    models = list(enumerate_models(knowledge, names))
+    return [symbol for symbol in symbols
+            if all(symbol.evaluate(model) for model in models)]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import random
+import string
+
+from logic import *
+
+
+def person_names(people):
+    """Returns names for `people` characters: A, B, ..., Z, A1, B1, ..."""
+    letters = string.ascii_uppercase
+    return [
+        letters[i % 26] + (str(i // 26) if i >= 26 else "")
+        for i in range(people)
+    ]
+
+
+def generate_puzzle(people=3, statements=3, depth=2, seed=None):
+    """
+    Generate a random knights-and-knaves puzzle.
+
+    Every character is a knight or a knave but not both, and each
+    statement is a claim of nesting depth up to `depth` made by a random
+    character. A hidden assignment is chosen first and every claim is
+    made true or false to match its speaker, so the puzzle always has at
+    least one solution.
+
+    Return a tuple (knowledge, symbols, solution), where `symbols` is the
+    list of Knight and Knave symbols and `solution` is the hidden model.
+    """
+    rng = random.Random(seed)
+    names = person_names(people)
+    knights = {name: Symbol(f"{name} is a Knight") for name in names}
+    knaves = {name: Symbol(f"{name} is a Knave") for name in names}
+
+    solution = dict()
+    for name in names:
+        is_knight = rng.random() < 0.5
+        solution[knights[name].name] = is_knight
+        solution[knaves[name].name] = not is_knight
+
+    knowledge = And()
+    for name in names:
+        knowledge.add(Or(knights[name], knaves[name]))
+        knowledge.add(Not(And(knights[name], knaves[name])))
+
+    def claim(depth):
+        """Returns a random claim about the characters."""
+        if depth == 0 or rng.random() < 0.3:
+            name = rng.choice(names)
+            return rng.choice((knights[name], knaves[name]))
+        kind = rng.randrange(4)
+        if kind == 0:
+            return Not(claim(depth - 1))
+        if kind == 1:
+            return And(claim(depth - 1), claim(depth - 1))
+        if kind == 2:
+            return Or(claim(depth - 1), claim(depth - 1))
+        return Implication(claim(depth - 1), claim(depth - 1))
+
+    for _ in range(statements):
+        speaker = rng.choice(names)
+        statement = claim(depth)
+
+        # Knights only say true things and knaves only false ones
+        if statement.evaluate(solution) != solution[knights[speaker].name]:
+            statement = Not(statement)
+        knowledge.add(Implication(knights[speaker], statement))
+        knowledge.add(Implication(knaves[speaker], Not(statement)))
+
+    symbols = [symbol for name in names
+               for symbol in (knights[name], knaves[name])]
+    return knowledge, symbols, solution
@@ -1,19 +1,171 @@
+import collections
 import itertools
+import multiprocessing
+import operator
+import os
+
+# Symbols fixed at a time within a shard, between checks of whether
+# another shard has already found a counter-model
+SHARD_SPLIT = 4
 
 
 class Sentence():
 
     def evaluate(self, model):
-        """Evaluates the logical sentence."""
-        raise Exception("nothing to evaluate")
+        """
+        Evaluates the logical sentence, walking it with explicit stacks
+        of the nodes being evaluated and how many operands each has done,
+        and skipping operands once a node's value is decided.
+        """
+        nodes = []
+        done = []
+        lefts = []
+        node = self
+        try:
+            while True:
+
+                # Descend along first operands down to a value
+                while True:
+                    kind = type(node)
+                    if kind is Symbol:
+                        value = bool(model[node.name])
+                        break
+                    if kind is And or kind is Or:
+                        operands = node.operands()
+                        if not operands:
+                            value = kind is And
+                            break
+                    elif (kind is Not or kind is Implication
+                            or kind is Biconditional):
+                        operands = node.operands()
+                    else:
+                        value = fold(node, lambda node, values:
+                                     node._evaluate(values, model))
+                        break
+                    nodes.append(node)
+                    done.append(0)
+                    node = operands[0]
+
+                # Climb back up until a node still has operands to visit
+                while nodes:
+                    parent = nodes[-1]
+                    kind = type(parent)
+                    if kind is And or kind is Or:
+
+                        # Take symbol operands here rather than descending
+                        operands = parent.operands()
+                        decided = kind is Or
+                        count = done[-1] + 1
+                        while value is not decided and count < len(operands):
+                            node = operands[count]
+                            if type(node) is not Symbol:
+                                break
+                            value = bool(model[node.name])
+                            count += 1
+                        else:
+                            nodes.pop()
+                            done.pop()
+                            continue
+                        done[-1] = count
+                        break
+                    if kind is Not:
+                        value = not value
+                    elif not done[-1]:
+                        if kind is Implication:
+                            if not value:
+                                value = True
+                                nodes.pop()
+                                done.pop()
+                                continue
+                        else:
+                            lefts.append(value)
+                        done[-1] = 1
+                        node = parent.operands()[1]
+                        break
+                    elif kind is Biconditional:
+                        value = lefts.pop() == value
+                    nodes.pop()
+                    done.pop()
+                else:
+                    return value
+        except KeyError as error:
+            raise Exception(f"variable {error.args[0]} not in model")
 
     def formula(self):
         """Returns string formula representing logical sentence."""
-        return ""
+        return write(self, lambda sentence: sentence._formula_parts())
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        names = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Symbol):
+                names.add(node.name)
+            else:
+                stack.extend(node.operands())
+        return names
+
+    def simplify(self, model):
+        """
+        Returns True or False if the sentence is decided by the partial
+        `model`, otherwise the sentence with assigned symbols removed.
+        """
+        return fold(self, lambda node, values: node._simplify(values, model))
+
+    def operands(self):
+        """Returns the sentences this sentence is built from."""
+        return ()
+
+    def needs_parentheses(self):
+        """Checks if parenthesize would wrap this sentence's formula."""
+        sentence = self
+        while isinstance(sentence, (And, Or)) and len(sentence.operands()) == 1:
+            sentence = sentence.operands()[0]
+        if isinstance(sentence, Symbol):
+            return Sentence.parenthesize(sentence.name) != sentence.name
+        return bool(sentence.operands()) or isinstance(sentence, Not)
+
+    def __eq__(self, other):
+        pairs = [(self, other)]
+        while pairs:
+            left, right = pairs.pop()
+            if left is right:
+                continue
+            if not left._matches(right):
+                return False
+            if len(left.operands()) != len(right.operands()):
+                return False
+            pairs.extend(zip(left.operands(), right.operands()))
+        return True
+
+    def __hash__(self):
+        return fold(self, lambda node, hashes: node._hash(hashes))
+
+    def __repr__(self):
+        return write(self, lambda sentence: sentence._repr_parts())
+
+    def _short_circuit(self, values):
+        return None
+
+    def _evaluate(self, values, model):
+        raise Exception("nothing to evaluate")
+
+    def _simplify(self, operands, model):
+        raise Exception("nothing to simplify")
+
+    def _formula_parts(self):
+        return []
+
+    def _repr_parts(self):
+        return [object.__repr__(self)]
+
+    def _matches(self, other):
+        return self is other
+
+    def _hash(self, hashes):
+        return object.__hash__(self)
 
     @classmethod
     def validate(cls, sentence):
@@ -41,15 +193,19 @@ class Sentence():
         else:
             return f"({s})"
 
+    @classmethod
+    def wrap(cls, sentence):
+        """Returns formula parts for an operand, parenthesized if needed."""
+        if sentence.needs_parentheses():
+            return ["(", sentence, ")"]
+        return [sentence]
+
 
 class Symbol(Sentence):
 
     def __init__(self, name):
         self.name = name
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
     def __hash__(self):
         return hash(("symbol", self.name))
 
@@ -68,29 +224,55 @@ class Symbol(Sentence):
     def symbols(self):
         return {self.name}
 
+    def _evaluate(self, values, model):
+        return self.evaluate(model)
+
+    def _simplify(self, operands, model):
+        if self.name in model:
+            return bool(model[self.name])
+        return self
+
+    def _formula_parts(self):
+        return [self.name]
+
+    def _repr_parts(self):
+        return [self.name]
+
+    def _matches(self, other):
+        return isinstance(other, Symbol) and self.name == other.name
+
+    def _hash(self, hashes):
+        return hash(("symbol", self.name))
+
 
 class Not(Sentence):
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def operands(self):
+        return (self.operand,)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def _evaluate(self, values, model):
+        return not values[0]
 
-    def __repr__(self):
-        return f"Not({self.operand})"
+    def _simplify(self, operands, model):
+        operand, = operands
+        if isinstance(operand, bool):
+            return not operand
+        return self if operand is self.operand else Not(operand)
 
-    def evaluate(self, model):
-        return not self.operand.evaluate(model)
+    def _formula_parts(self):
+        return ["¬", *Sentence.wrap(self.operand)]
 
-    def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+    def _repr_parts(self):
+        return ["Not(", self.operand, ")"]
 
-    def symbols(self):
-        return self.operand.symbols()
+    def _matches(self, other):
+        return isinstance(other, Not)
+
+    def _hash(self, hashes):
+        return hash(("not", *hashes))
 
 
 class And(Sentence):
@@ -99,35 +281,49 @@ class And(Sentence):
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
-
-    def __repr__(self):
-        conjunctions = ", ".join(
-            [str(conjunct) for conjunct in self.conjuncts]
-        )
-        return f"And({conjunctions})"
-
     def add(self, conjunct):
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
 
-    def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+    def operands(self):
+        return self.conjuncts
 
-    def formula(self):
+    def _short_circuit(self, values):
+        return False if values[-1] is False else None
+
+    def _evaluate(self, values, model):
+        return all(values)
+
+    def _simplify(self, operands, model):
+        conjuncts = []
+        for value in operands:
+            if value is False:
+                return False
+            if value is not True:
+                conjuncts.append(value)
+        if not conjuncts:
+            return True
+        if len(conjuncts) == 1:
+            return conjuncts[0]
+        if (len(conjuncts) == len(self.conjuncts)
+                and all(map(operator.is_, conjuncts, self.conjuncts))):
+            return self
+        return And(*conjuncts)
+
+    def _formula_parts(self):
         if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+            return [self.conjuncts[0]]
+        return join(" ∧ ", [Sentence.wrap(conjunct)
+                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def _repr_parts(self):
+        return ["And(", *join(", ", [[c] for c in self.conjuncts]), ")"]
+
+    def _matches(self, other):
+        return isinstance(other, And)
+
+    def _hash(self, hashes):
+        return hash(("and", tuple(hashes)))
 
 
 class Or(Sentence):
@@ -136,29 +332,45 @@ class Or(Sentence):
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
-
-    def __repr__(self):
-        disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
-        return f"Or({disjuncts})"
+    def operands(self):
+        return self.disjuncts
+
+    def _short_circuit(self, values):
+        return True if values[-1] is True else None
+
+    def _evaluate(self, values, model):
+        return any(values)
+
+    def _simplify(self, operands, model):
+        disjuncts = []
+        for value in operands:
+            if value is True:
+                return True
+            if value is not False:
+                disjuncts.append(value)
+        if not disjuncts:
+            return False
+        if len(disjuncts) == 1:
+            return disjuncts[0]
+        if (len(disjuncts) == len(self.disjuncts)
+                and all(map(operator.is_, disjuncts, self.disjuncts))):
+            return self
+        return Or(*disjuncts)
+
+    def _formula_parts(self):
+        if len(self.disjuncts) == 1:
+            return [self.disjuncts[0]]
+        return join(" ∨  ", [Sentence.wrap(disjunct)
+                             for disjunct in self.disjuncts])
 
-    def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+    def _repr_parts(self):
+        return ["Or(", *join(", ", [[d] for d in self.disjuncts]), ")"]
 
-    def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+    def _matches(self, other):
+        return isinstance(other, Or)
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def _hash(self, hashes):
+        return hash(("or", tuple(hashes)))
 
 
 class Implication(Sentence):
@@ -168,28 +380,41 @@ class Implication(Sentence):
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    def operands(self):
+        return (self.antecedent, self.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def _short_circuit(self, values):
+        return True if values[0] is False else None
 
-    def __repr__(self):
-        return f"Implication({self.antecedent}, {self.consequent})"
+    def _evaluate(self, values, model):
+        antecedent, consequent = values
+        return (not antecedent) or consequent
 
-    def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+    def _simplify(self, operands, model):
+        antecedent, consequent = operands
+        if antecedent is False:
+            return True
+        if antecedent is True or consequent is True:
+            return consequent
+        if consequent is False:
+            return Not(antecedent)
+        if (antecedent is self.antecedent
+                and consequent is self.consequent):
+            return self
+        return Implication(antecedent, consequent)
 
-    def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+    def _formula_parts(self):
+        return [*Sentence.wrap(self.antecedent), " => ",
+                *Sentence.wrap(self.consequent)]
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def _repr_parts(self):
+        return ["Implication(", self.antecedent, ", ", self.consequent, ")"]
+
+    def _matches(self, other):
+        return isinstance(other, Implication)
+
+    def _hash(self, hashes):
+        return hash(("implies", *hashes))
 
 
 class Biconditional(Sentence):
@@ -199,65 +424,378 @@ class Biconditional(Sentence):
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
-
-    def __repr__(self):
-        return f"Biconditional({self.left}, {self.right})"
+    def operands(self):
+        return (self.left, self.right)
+
+    def _evaluate(self, values, model):
+        left, right = values
+        return left == right
+
+    def _simplify(self, operands, model):
+        left, right = operands
+        if isinstance(left, bool) and isinstance(right, bool):
+            return left == right
+        if isinstance(left, bool):
+            left, right = right, left
+        if right is True:
+            return left
+        if right is False:
+            return Not(left)
+        if left is self.left and right is self.right:
+            return self
+        return Biconditional(left, right)
+
+    def _formula_parts(self):
+        return [*Sentence.wrap(self.left), " <=> ",
+                *Sentence.wrap(self.right)]
+
+    def _repr_parts(self):
+        return ["Biconditional(", self.left, ", ", self.right, ")"]
+
+    def _matches(self, other):
+        return isinstance(other, Biconditional)
+
+    def _hash(self, hashes):
+        return hash(("biconditional", *hashes))
+
+
+def fold(sentence, combine):
+    """
+    Returns `combine(node, values)` for the root of a sentence, where
+    `values` are the results for the node's operands, computed bottom-up
+    with an explicit stack. Operands are visited left to right and the
+    rest are skipped once the node's `_short_circuit` decides its value.
+    """
+    stack = []
+    node = sentence
+    while True:
+
+        # Descend along first operands down to a leaf
+        operands = node.operands()
+        while operands:
+            stack.append((node, operands, []))
+            node = operands[0]
+            operands = node.operands()
+        value = combine(node, [])
+
+        # Climb back up until a node still has operands to visit
+        while stack:
+            parent, operands, values = stack[-1]
+            values.append(value)
+            result = parent._short_circuit(values)
+            if result is None:
+                if len(values) < len(operands):
+                    node = operands[len(values)]
+                    break
+                result = combine(parent, values)
+            stack.pop()
+            value = result
+        else:
+            return value
+
+
+def write(sentence, parts):
+    """
+    Returns the text of a sentence, where `parts` maps a sentence to a
+    list of strings and operand sentences to be written in its place.
+    """
+    output = []
+    stack = [sentence]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            output.append(item)
+        else:
+            stack.extend(reversed(parts(item)))
+    return "".join(output)
 
-    def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
 
-    def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+def join(separator, groups):
+    """Returns the lists in `groups` concatenated with `separator` between."""
+    parts = []
+    for i, group in enumerate(groups):
+        if i:
+            parts.append(separator)
+        parts.extend(group)
+    return parts
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
 
+def check_all(knowledge, query, symbols, model):
+    """Checks if knowledge base entails query, given a particular model."""
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    # If model has an assignment for each symbol
+    if not symbols:
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+        # If knowledge base is true in model, then query must also be true
+        if knowledge.evaluate(model):
+            return query.evaluate(model)
+        return True
+    else:
 
-        # If model has an assignment for each symbol
-        if not symbols:
+        # Choose one of the remaining unused symbols
+        remaining = symbols.copy()
+        p = remaining.pop()
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
+        # Create a model where the symbol is true
+        model_true = model.copy()
+        model_true[p] = True
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+        # Create a model where the symbol is false
+        model_false = model.copy()
+        model_false[p] = False
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+        # Ensure entailment holds in both models
+        return (check_all(knowledge, query, remaining, model_true) and
+                check_all(knowledge, query, remaining, model_false))
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
 
     # Get all symbols in both knowledge and query
     symbols = set.union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def check_shard(shard):
+    """
+    Checks one (call, knowledge, query, symbols, model) shard in a worker,
+    a few symbols at a time, giving up once the `ParallelModelChecker`
+    call it belongs to has already found a counter-model.
+    """
+    call, knowledge, query, symbols, model = shard
+    fixed, remaining = symbols[:SHARD_SPLIT], set(symbols[SHARD_SPLIT:])
+    for values in itertools.product((True, False), repeat=len(fixed)):
+        if stopped.value == call:
+            return True
+        if not check_all(knowledge, query, remaining,
+                         {**model, **dict(zip(fixed, values))}):
+            return False
+    return True
+
+
+def start_checker(flag):
+    """Sets the flag `check_shard` reads to see which call has stopped."""
+    global stopped
+    stopped = flag
+
+
+class ParallelModelChecker():
+    """
+    Pool of processes that checks entailment like `model_check`, kept
+    open across queries so each query does not pay for starting one.
+
+    The first `split` symbols of a query are fixed to split its model
+    space into 2 ** split shards, each checked by `check_all` in a worker
+    process. Once any shard finds a counter-model, a shared flag tells
+    the other shards of that query to stop early, so the result is
+    always the same as `model_check`.
+    """
+
+    def __init__(self, processes=None, split=None):
+        self.processes = processes or os.cpu_count() or 1
+
+        # Use enough shards to keep every process busy a few times over
+        if split is None:
+            split = max(self.processes * 4 - 1, 0).bit_length()
+        self.split = split
+        self.calls = 0
+        self.pool = None
+        if self.processes > 1:
+            self.stopped = multiprocessing.RawValue("q", -1)
+            self.pool = multiprocessing.Pool(
+                self.processes, start_checker, (self.stopped,)
+            )
+
+    def check(self, knowledge, query):
+        """Checks if knowledge base entails query."""
+        symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+        split = min(self.split, len(symbols))
+        if self.pool is None or split == 0:
+            return model_check(knowledge, query)
+
+        self.calls += 1
+        fixed, remaining = symbols[:split], symbols[split:]
+        shards = [
+            (self.calls, knowledge, query, remaining,
+             dict(zip(fixed, values)))
+            for values in itertools.product((True, False), repeat=split)
+        ]
+        for entailed in self.pool.imap_unordered(check_shard, shards):
+            if not entailed:
+                self.stopped.value = self.calls
+                return False
+        return True
+
+    def close(self):
+        """
+        Waits for the workers to finish and stops them. Shards of a query
+        that already failed return at once, and the pool is never
+        terminated while shards are still being handed out.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parallel_model_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query, using a pool of processes
+    started for this query alone. See `ParallelModelChecker`.
+    """
+    with ParallelModelChecker(processes, split) as checker:
+        return checker.check(knowledge, query)
+
+
+def conjuncts(sentence):
+    """Returns a list of the top-level conjuncts of a sentence."""
+    result = []
+    stack = [sentence]
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, And):
+            stack.extend(reversed(sentence.conjuncts))
+        else:
+            result.append(sentence)
+    return result
+
+
+def enumerate_models(knowledge, symbols=None):
+    """
+    Lazily yields every model (a dict from symbol name to bool) in which
+    the knowledge base is true, over the knowledge base's symbols plus
+    any extra symbol names in `symbols`.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), set(symbols or ())))
+
+    def extend(sentence, i, model):
+        """Yields models of `sentence` that extend the partial `model`."""
+
+        # Once the sentence is decided the remaining symbols are free
+        if sentence is True:
+            for values in itertools.product((True, False),
+                                            repeat=len(symbols) - i):
+                yield {**model, **dict(zip(symbols[i:], values))}
+            return
+        p = symbols[i]
+        for value in (True, False):
+            remaining = sentence.simplify({p: value})
+            if remaining is not False:
+                yield from extend(remaining, i + 1, {**model, p: value})
+
+    sentence = knowledge.simplify(dict())
+    if sentence is False:
+        return
+    yield from extend(sentence, 0, dict())
+
+
+def count_models(knowledge, symbols=None):
+    """
+    Returns the number of models in which the knowledge base is true,
+    over the knowledge base's symbols plus any extra symbol names in
+    `symbols`.
+
+    Conjuncts that share no symbols are counted independently and the
+    counts multiplied, and the count of every sub-problem is cached.
+    """
+    symbols = frozenset(set.union(knowledge.symbols(), set(symbols or ())))
+    sentence = knowledge.simplify(dict())
+    if sentence is False:
+        return 0
+    if sentence is True:
+        return 2 ** len(symbols)
+    return count_conjuncts(conjuncts(sentence), symbols, dict())
+
+
+def count_conjuncts(clauses, symbols, cache):
+    """Counts models of the conjunction of `clauses` over `symbols`."""
+    key = (frozenset(clauses), symbols)
+    if key in cache:
+        return cache[key]
+    if not clauses:
+        return 2 ** len(symbols)
+
+    clause_symbols = [clause.symbols() for clause in clauses]
+    used = set.union(set(), *clause_symbols)
+    free = len(symbols) - len(used)
+    components = connected_components(clauses, clause_symbols)
+
+    # Independent components multiply
+    if len(components) > 1:
+        total = 1
+        for component, component_symbols in components:
+            total *= count_conjuncts(component, component_symbols, cache)
+            if not total:
+                break
+
+    # Otherwise branch on the symbol shared by the most clauses
+    else:
+        occurrences = collections.Counter(
+            symbol for symbols in clause_symbols for symbol in symbols
+        )
+        p = min(occurrences, key=lambda symbol: (-occurrences[symbol], symbol))
+        total = 0
+        for value in (True, False):
+            branch = []
+            for clause in clauses:
+                clause = clause.simplify({p: value})
+                if clause is False:
+                    break
+                if clause is not True:
+                    branch.extend(conjuncts(clause))
+            else:
+                total += count_conjuncts(branch, frozenset(used - {p}), cache)
+
+    cache[key] = total * 2 ** free
+    return cache[key]
+
+
+def connected_components(clauses, clause_symbols):
+    """
+    Groups clauses, given the symbols of each clause, into components
+    that share no symbols, returning a list of (clauses, symbols) pairs.
+    """
+    parent = dict()
+
+    def find(symbol):
+        while parent[symbol] != symbol:
+            parent[symbol] = parent[parent[symbol]]
+            symbol = parent[symbol]
+        return symbol
+
+    for symbols in clause_symbols:
+        symbols = list(symbols)
+        for symbol in symbols:
+            parent.setdefault(symbol, symbol)
+        for symbol in symbols[1:]:
+            parent[find(symbol)] = find(symbols[0])
+
+    components = dict()
+    for clause, symbols in zip(clauses, clause_symbols):
+        root = find(next(iter(symbols)))
+        group, group_symbols = components.setdefault(root, ([], set()))
+        group.append(clause)
+        group_symbols.update(symbols)
+    return [(group, frozenset(group_symbols))
+            for group, group_symbols in components.values()]
+
+
+def probability(knowledge, query):
+    """
+    Returns the fraction of the knowledge base's models in which the
+    query is also true, assuming every model is equally likely.
+    """
+    symbols = set.union(knowledge.symbols(), query.symbols())
+    total = count_models(knowledge, symbols)
+    if not total:
+        raise ValueError("knowledge base is unsatisfiable")
+    return count_models(And(knowledge, query), symbols) / total
@@ -96,8 +96,11 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # A symbol is entailed if it is true in every model of the puzzle
+            names = set.union(*[symbol.symbols() for symbol in symbols])
+            models = list(enumerate_models(knowledge, names))
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if all(symbol.evaluate(model) for model in models):
                     print(f"    {symbol}")
 
 
@@ -1,43 +1,103 @@
+import collections
+import functools
 import itertools
+import math
 import random
+import time
+
+
+class Neighbors(dict):
+    """
+    Map from each cell of a board to a tuple of the cells within one
+    row and column of it, not including the cell itself.
+    Entries are worked out the first time a cell is looked up.
+    """
+
+    def __init__(self, height, width):
+        super().__init__()
+        self.height = height
+        self.width = width
+
+    def __missing__(self, cell):
+        i, j = cell
+        neighbors = tuple(
+            (r, c)
+            for r in range(max(i - 1, 0), min(i + 2, self.height))
+            for c in range(max(j - 1, 0), min(j + 2, self.width))
+            if (r, c) != cell
+        )
+        self[cell] = neighbors
+        return neighbors
+
+
+@functools.lru_cache(maxsize=None)
+def neighbor_table(height, width):
+    """Returns the Neighbors table shared by all boards of a given size."""
+    return Neighbors(height, width)
 
 
 class Minesweeper():
     """Minesweeper game representation"""
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, sparse=False):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
         self.mines = set()
+        self.mine_count = mines
+        self.neighbors = neighbor_table(height, width)
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # A sparse board only stores where the mines are, and places
+        # them on the first click so that the first click is safe
+        self.sparse = sparse
+        self.board = None
+        self.counts = None
+        self.placed = False
+
+        if not sparse:
+
+            # Initialize an empty field with no mines
+            self.board = [[False] * width for _ in range(height)]
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+            # Add mines randomly
+            self.place_mines(random.sample(range(height * width), mines))
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    def place_mines(self, indices):
+        """
+        Places mines on the cells with the given linear indices, where
+        cell (i, j) has index i * width + j.
+        """
+        self.mines = {divmod(k, self.width) for k in indices}
+        self.placed = True
+        if self.sparse:
+            return
+
+        # Count the mines around every cell once, by adding each mine
+        # to the counts of its neighbors
+        self.counts = [[0] * self.width for _ in range(self.height)]
+        for i, j in self.mines:
+            self.board[i][j] = True
+            for r, c in self.neighbors[(i, j)]:
+                self.counts[r][c] += 1
+
+    def place_mines_avoiding(self, cell):
+        """Places the mines at random anywhere except on `cell`."""
+        safe = cell[0] * self.width + cell[1]
+        indices = random.sample(range(self.height * self.width - 1),
+                                self.mine_count)
+        self.place_mines([k + 1 if k >= safe else k for k in indices])
+
     def print(self):
         """Prints a text-based representation of where mines are located."""
 
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if (i, j) in self.mines:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -45,6 +105,11 @@ class Minesweeper():
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
+        if not self.placed:
+            self.place_mines_avoiding(cell)
+            return False
+        if self.sparse:
+            return cell in self.mines
         i, j = cell
         return self.board[i][j]
 
@@ -54,29 +119,17 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        if self.sparse:
+            return sum(
+                neighbor in self.mines for neighbor in self.neighbors[cell]
+            )
+        i, j = cell
+        return self.counts[i][j]
 
     def won(self):
         """Checks if all mines have been flagged."""
 
-        return self.mines_found == self.mines
+        return self.placed and self.mines_found == self.mines
 
 
 class Sentence():
@@ -93,13 +146,29 @@ class Sentence():
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        # Sentences must not be changed while stored in a set or dict,
+        # so the AI takes them out of its knowledge before marking cells
+        return hash((frozenset(self.cells), self.count))
+
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def issubset(self, other):
+        """Checks if every cell in self.cells is also in other.cells."""
+        return self.cells <= other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells in self.cells but not in
+        other.cells, given that other.cells is a subset of self.cells.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
     def known_mines(self):
         """Returns the set of all cells in self.cells known to be mines."""
 
-        if self.count == 0:
+        if len(self.cells) == self.count:
             return self.cells
         else:
             return None
@@ -129,15 +198,140 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Minesweeper sentence storing its cells as the bits of an integer.
+
+    Cell (i, j) is bit i * width + j of the board. Only the bits from
+    the sentence's first cell onwards are kept, shifted down to `base`,
+    so sentences on a large board stay small integers.
+    """
+
+    def __init__(self, cells, count, width):
+        self.width = width
+        self.count = count
+        self.base = 0
+        self.mask = 0
+        self.decoded = None
+        indices = [i * width + j for i, j in cells]
+        if indices:
+            self.base = min(indices)
+            for k in indices:
+                self.mask |= 1 << (k - self.base)
+
+    @classmethod
+    def from_mask(cls, base, mask, count, width):
+        """Returns a sentence from a mask of cells starting at `base`."""
+        sentence = cls((), count, width)
+        if mask:
+            low = (mask & -mask).bit_length() - 1
+            sentence.base = base + low
+            sentence.mask = mask >> low
+        return sentence
+
+    @property
+    def cells(self):
+        # Decoded once and kept until the sentence changes
+        if self.decoded is None:
+            self.decoded = set()
+            mask = self.mask
+            while mask:
+                low = mask & -mask
+                k = self.base + low.bit_length() - 1
+                self.decoded.add(divmod(k, self.width))
+                mask ^= low
+        return self.decoded
+
+    def __eq__(self, other):
+        return (self.base, self.mask, self.count) == (
+            other.base, other.mask, other.count)
+
+    def __hash__(self):
+        return hash((self.base, self.mask, self.count))
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def aligned(self, other):
+        """Returns other.mask shifted to line up with self.mask."""
+        if other.base >= self.base:
+            return other.mask << (other.base - self.base)
+        return other.mask >> (self.base - other.base)
+
+    def issubset(self, other):
+        """Checks if every cell in this sentence is also in `other`."""
+        if self.base < other.base:
+            return not self.mask
+        mask = other.aligned(self)
+        return mask & other.mask == mask
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells in this sentence but not in
+        `other`, given that `other` is a subset of this sentence.
+        """
+        return BitSentence.from_mask(
+            self.base, self.mask & ~self.aligned(other),
+            self.count - other.count, self.width)
+
+    def known_mines(self):
+        """Returns the set of all cells in self.cells known to be mines."""
+        if self.mask.bit_count() == self.count:
+            return self.cells
+        return None
+
+    def known_safes(self):
+        """Returns the set of all cells in self.cells known to be safe."""
+        if not self.count:
+            return self.cells
+        return None
+
+    def remove(self, cell):
+        """Removes a cell, returning True if it was in the sentence."""
+        k = cell[0] * self.width + cell[1] - self.base
+        if k < 0 or not self.mask >> k & 1:
+            return False
+        sentence = BitSentence.from_mask(
+            self.base, self.mask ^ (1 << k), self.count, self.width)
+        self.base, self.mask = sentence.base, sentence.mask
+        self.decoded = None
+        return True
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        if self.remove(cell):
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        self.remove(cell)
+
+
 class MinesweeperAI():
     """Minesweeper game player"""
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, time_limit=0.5,
+                 solver=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines, if known, and seconds allowed for
+        # working out mine probabilities when guessing
+        self.total_mines = mines
+        self.time_limit = time_limit
+
+        # Whether to solve the sentences as a system of linear equations
+        # when the subset rule finds no safe move
+        self.solver = solver
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -145,8 +339,23 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells known to be safe that have not been clicked on yet
+        self.safe_moves = set()
+
+        # Neighboring cells of every cell on the board
+        self.neighbors = neighbor_table(height, width)
+
+        # Set of sentences about the game known to be true
+        self.knowledge = set()
+
+        # Map from each cell to the sentences that mention it
+        self.index = dict()
+
+        # Sentences added or changed since they were last examined
+        self.pending = collections.deque()
+
+        # Mine configurations counted for each group of sentences
+        self.configurations = dict()
 
     def mark_mine(self, cell):
         """
@@ -154,8 +363,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in list(self.index.get(cell, ())):
+            self.remove_sentence(sentence)
             sentence.mark_mine(cell)
+            self.add_sentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -163,8 +374,46 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if cell not in self.moves_made:
+            self.safe_moves.add(cell)
+        for sentence in list(self.index.get(cell, ())):
+            self.remove_sentence(sentence)
             sentence.mark_safe(cell)
+            self.add_sentence(sentence)
+
+    def make_sentence(self, cells, count):
+        """Returns a new sentence about `cells`."""
+        return Sentence(cells, count)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, unless it has no cells
+        or is already known. Returns True if the sentence was added.
+        """
+        if not sentence.cells or sentence in self.knowledge:
+            return False
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(sentence)
+        self.pending.append(sentence)
+        return True
+
+    def remove_sentence(self, sentence):
+        """Removes a sentence from the knowledge base and the index."""
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            sentences = self.index[cell]
+            sentences.discard(sentence)
+            if not sentences:
+                del self.index[cell]
+
+    def overlapping(self, sentence):
+        """Returns the other sentences sharing a cell with `sentence`."""
+        sentences = set()
+        for cell in sentence.cells:
+            sentences.update(self.index.get(cell, ()))
+        sentences.discard(sentence)
+        return sentences
 
     def add_knowledge(self, cell, count):
         """
@@ -182,42 +431,80 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         self.mark_safe(cell)
 
         cells = set()
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-                if (i, j) == cell:
-                    continue
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if (i, j) not in self.moves_made and (i, j) not in self.mines:
-                        cells.add((i, j))
-                    elif (i, j) in self.mines:
-                        count -= 1
-        self.knowledge.append(Sentence(cells, count))
+        for neighbor in self.neighbors[cell]:
+            if neighbor in self.mines:
+                count -= 1
+            elif neighbor not in self.safes:
+                cells.add(neighbor)
+        self.add_sentence(self.make_sentence(cells, count))
+        self.infer()
+        while self.solver and not self.safe_moves and self.solve():
+            self.infer()
+
+    def infer(self):
+        """
+        Draws every conclusion that follows from the pending sentences.
+
+        Each pending sentence either marks its cells as safe or as mines,
+        or is compared with the sentences sharing a cell with it to infer
+        new ones. Marking cells and inferring sentences adds the sentences
+        they change to the queue, so this runs until nothing new follows.
+        """
+        while self.pending:
+            sentence = self.pending.popleft()
+            if sentence not in self.knowledge:
+                continue
 
-        for sentence in self.knowledge:
             safes = sentence.known_safes()
             if safes:
                 for cell in safes.copy():
                     self.mark_safe(cell)
+                continue
             mines = sentence.known_mines()
             if mines:
                 for cell in mines.copy():
                     self.mark_mine(cell)
+                continue
+
+            # Only sentences that share a cell can be subsets of each other
+            for other in self.overlapping(sentence):
+                if sentence.issubset(other):
+                    self.add_sentence(other.difference(sentence))
+                elif other.issubset(sentence):
+                    self.add_sentence(sentence.difference(other))
+
+    def solve(self):
+        """
+        Treats each group of connected sentences as a system of linear
+        equations over its cells, where a mine is 1 and a safe cell 0,
+        and marks every cell the system forces to be safe or a mine.
+        Returns True if any cell was marked.
+        """
+        safes = set()
+        mines = set()
+        for sentences in self.components():
+            cells = list(set().union(*[s.cells for s in sentences]))
+            column = {cell: j for j, cell in enumerate(cells)}
+            rows = []
+            for sentence in sentences:
+                row = [0] * (len(cells) + 1)
+                for cell in sentence.cells:
+                    row[column[cell]] = 1
+                row[-1] = sentence.count
+                rows.append(row)
+            for j, mine in forced_values(rows).items():
+                (mines if mine else safes).add(cells[j])
+
+        for cell in safes:
+            self.mark_safe(cell)
+        for cell in mines:
+            self.mark_mine(cell)
+        return bool(safes or mines)
 
-        for s1 in self.knowledge:
-            for s2 in self.knowledge:
-                if s1 is s2:
-                    continue
-                if s1 == s2:
-                    self.knowledge.remove(s2)
-                elif s1.cells.issubset(s2.cells):
-                    new_knowledge = Sentence(
-                        s2.cells - s1.cells,
-                        s2.count - s1.count)
-                    if new_knowledge not in self.knowledge:
-                        self.knowledge.append(new_knowledge)
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -227,7 +514,7 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        steps = self.safes - self.moves_made
+        steps = self.safe_moves
         if steps:
             value = random.choice(tuple(steps))
             return value
@@ -236,15 +523,330 @@ class MinesweeperAI():
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Should choose among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        picking at random among the cells least likely to be a mine.
+        Returns None if there is no such cell.
         """
         jogadas_possíveis = [(i, j) for i in range(self.height) for j in range(self.width) if
                              (i, j) not in self.moves_made and (i, j) not in self.mines]
+        if not jogadas_possíveis:
+            return None
+
         # if there is not KB, so any move is good.
         if not self.knowledge:
-            jogada = random.choice(jogadas_possíveis)
-            return jogada
+            return random.choice(jogadas_possíveis)
+
+        probabilities = self.mine_probabilities(jogadas_possíveis)
+        lowest = min(probabilities.values())
+        return random.choice([
+            cell for cell in jogadas_possíveis
+            if probabilities[cell] <= lowest + 1e-9
+        ])
+
+    def mine_probabilities(self, cells):
+        """
+        Returns a dictionary mapping each of `cells` (none of which are
+        known mines) to the probability that it is a mine.
+
+        Sentences that share no cells are independent, so each group of
+        connected sentences is solved on its own by counting the mine
+        configurations consistent with it. Those counts are combined with
+        the total number of mines, when known, which also weighs the
+        cells no sentence mentions. If counting takes longer than
+        self.time_limit, each cell gets a local estimate instead.
+        """
+        deadline = time.perf_counter() + self.time_limit
+        components = []
+        configurations = dict()
+        for sentences in self.components():
+
+            # Reuse counts for groups of sentences unchanged since last time
+            key = frozenset(
+                (frozenset(sentence.cells), sentence.count)
+                for sentence in sentences
+            )
+            if key in self.configurations:
+                configurations[key] = self.configurations[key]
+            else:
+                configurations[key] = count_configurations(sentences, deadline)
+                if configurations[key] is None:
+                    return self.estimate_probabilities(cells)
+            components.append(configurations[key])
+        self.configurations = configurations
+
+        frontier = set(self.index)
+        others = [cell for cell in cells
+                  if cell not in frontier and cell not in self.safes]
+        probabilities = {cell: 0 for cell in cells}
+
+        # Without the total every frontier configuration is as likely
+        if self.total_mines is None:
+            for weights, counts in components:
+                total = sum(weights.values())
+                for k, cell_counts in counts.items():
+                    for cell, count in cell_counts.items():
+                        probabilities[cell] += count / total
+            if frontier:
+                density = sum(probabilities[c] for c in frontier) / len(frontier)
+                for cell in others:
+                    probabilities[cell] = density
+            return probabilities
+
+        # Otherwise weigh each configuration by the ways to place the
+        # remaining mines among the cells off the frontier
+        remaining = self.total_mines - len(self.mines)
+
+        def ways(k):
+            if not 0 <= remaining - k <= len(others):
+                return 0
+            return math.comb(len(others), remaining - k)
+
+        everything = convolve([weights for weights, _ in components])
+        total = sum(n * ways(k) for k, n in everything.items())
+        if not total:
+            return self.estimate_probabilities(cells)
+
+        for i, (_, counts) in enumerate(components):
+            rest = convolve([weights for j, (weights, _) in enumerate(components)
+                             if j != i])
+            for k, cell_counts in counts.items():
+                weight = sum(n * ways(k + j) for j, n in rest.items())
+                for cell, count in cell_counts.items():
+                    probabilities[cell] += count * weight / total
+
+        if others:
+            expected = sum(
+                n * ways(k) * (remaining - k) for k, n in everything.items()
+            ) / total
+            for cell in others:
+                probabilities[cell] = expected / len(others)
+        return probabilities
+
+    def estimate_probabilities(self, cells):
+        """
+        Returns a quick estimate of the probability that each of `cells`
+        is a mine, from the densest sentence each cell appears in.
+        """
+        unknown = [cell for cell in cells if cell not in self.safes]
+        if self.total_mines is not None and unknown:
+            density = (self.total_mines - len(self.mines)) / len(unknown)
         else:
-            return None
\ No newline at end of file
+            density = 0.5
+        probabilities = dict()
+        for cell in cells:
+            if cell in self.safes:
+                probabilities[cell] = 0
+            elif cell in self.index:
+                probabilities[cell] = max(
+                    sentence.count / len(sentence.cells)
+                    for sentence in self.index[cell]
+                )
+            else:
+                probabilities[cell] = density
+        return probabilities
+
+    def components(self):
+        """
+        Returns the knowledge split into lists of sentences, where
+        sentences in different lists share no cells.
+        """
+        components = []
+        seen = set()
+        for sentence in self.knowledge:
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            component = [sentence]
+            for current in component:
+                for other in self.overlapping(current):
+                    if other not in seen:
+                        seen.add(other)
+                        component.append(other)
+            components.append(component)
+        return components
+
+    def snapshot(self):
+        """
+        Returns the AI's state as a dictionary that can be written as
+        JSON. Cells are stored as indices i * width + j, sorted, and
+        each sentence as a pair [cells, count].
+        """
+        def indices(cells):
+            return sorted(i * self.width + j for i, j in cells)
+
+        return {
+            "ai": type(self).__name__,
+            "height": self.height,
+            "width": self.width,
+            "mines": self.total_mines,
+            "time_limit": self.time_limit,
+            "solver": self.solver,
+            "moves_made": indices(self.moves_made),
+            "known_mines": indices(self.mines),
+            "known_safes": indices(self.safes),
+            "knowledge": sorted(
+                [indices(sentence.cells), sentence.count]
+                for sentence in self.knowledge
+            ),
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """Returns an AI in the state described by `snapshot`."""
+        width = snapshot["width"]
+        ai = cls(height=snapshot["height"], width=width,
+                 mines=snapshot["mines"], time_limit=snapshot["time_limit"],
+                 solver=snapshot["solver"])
+
+        def cells(indices):
+            return {divmod(index, width) for index in indices}
+
+        ai.moves_made = cells(snapshot["moves_made"])
+        ai.mines = cells(snapshot["known_mines"])
+        ai.safes = cells(snapshot["known_safes"])
+        ai.safe_moves = ai.safes - ai.moves_made
+        for indices, count in snapshot["knowledge"]:
+            ai.add_sentence(ai.make_sentence(cells(indices), count))
+
+        # A snapshot is taken between moves, when nothing is left to infer
+        ai.pending.clear()
+        return ai
+
+
+class BitMinesweeperAI(MinesweeperAI):
+    """Minesweeper player whose knowledge is made of BitSentences"""
+
+    def make_sentence(self, cells, count):
+        return BitSentence(cells, count, self.width)
+
+
+def count_configurations(sentences, deadline):
+    """
+    Counts the ways to place mines in the cells of `sentences` so that
+    every sentence holds, by backtracking over the cells.
+
+    Returns a pair (weights, counts): weights[k] is the number of
+    configurations with k mines, and counts[k][cell] is how many of those
+    have a mine in `cell`. Returns None if `deadline` passes first.
+    """
+
+    # Visit cells sentence by sentence so constraints close early
+    cells = []
+    position = dict()
+    for sentence in sentences:
+        for cell in sentence.cells:
+            if cell not in position:
+                position[cell] = len(cells)
+                cells.append(cell)
+    targets = [sentence.count for sentence in sentences]
+    unassigned = [len(sentence.cells) for sentence in sentences]
+    placed = [0] * len(sentences)
+    constraints = [[] for _ in cells]
+    for s, sentence in enumerate(sentences):
+        for cell in sentence.cells:
+            constraints[position[cell]].append(s)
+
+    weights = collections.Counter()
+    counts = collections.defaultdict(lambda: [0] * len(cells))
+    value = [-1] * len(cells)
+    i = 0
+    steps = 0
+    while i >= 0:
+        steps += 1
+        if not steps % 1024 and time.perf_counter() > deadline:
+            return None
+
+        # Every cell assigned: record the configuration
+        if i == len(cells):
+            k = sum(value)
+            weights[k] += 1
+            cell_counts = counts[k]
+            for j, mine in enumerate(value):
+                cell_counts[j] += mine
+            i -= 1
+            continue
+
+        # Undo the current value of cell i, then try the next one
+        if value[i] >= 0:
+            for s in constraints[i]:
+                unassigned[s] += 1
+                placed[s] -= value[i]
+        if value[i] == 1:
+            value[i] = -1
+            i -= 1
+            continue
+        value[i] += 1
+        consistent = True
+        for s in constraints[i]:
+            unassigned[s] -= 1
+            placed[s] += value[i]
+            if not placed[s] <= targets[s] <= placed[s] + unassigned[s]:
+                consistent = False
+        if consistent:
+            i += 1
+
+    return weights, {
+        k: {cell: cell_counts[j] for j, cell in enumerate(cells)}
+        for k, cell_counts in counts.items()
+    }
+
+
+def forced_values(rows):
+    """
+    Given a system of equations over 0/1 variables, as rows of integer
+    coefficients followed by the right-hand side, returns a dictionary
+    mapping each variable whose value is forced to that value.
+
+    The rows are put in reduced row echelon form with integer arithmetic.
+    A row is then checked against its bounds: if its right-hand side is
+    the least (or greatest) value its left-hand side can take, every
+    variable in it must be at the corresponding extreme.
+    """
+    rows = [row[:] for row in rows]
+    width = len(rows[0]) - 1 if rows else 0
+    pivot_row = 0
+    for j in range(width):
+        pivot = next((r for r in range(pivot_row, len(rows)) if rows[r][j]),
+                     None)
+        if pivot is None:
+            continue
+        rows[pivot_row], rows[pivot] = rows[pivot], rows[pivot_row]
+        p = rows[pivot_row]
+        for r, row in enumerate(rows):
+            if r != pivot_row and row[j]:
+                a, c = p[j], row[j]
+                row = [x * a - y * c for x, y in zip(row, p)]
+                divisor = math.gcd(*row)
+                rows[r] = [x // divisor for x in row] if divisor > 1 else row
+        pivot_row += 1
+        if pivot_row == len(rows):
+            break
+
+    forced = dict()
+    for row in rows:
+        *coefficients, total = row
+        low = sum(a for a in coefficients if a < 0)
+        high = sum(a for a in coefficients if a > 0)
+        if total not in (low, high):
+            continue
+        for j, a in enumerate(coefficients):
+            if a:
+                forced[j] = (a > 0) == (total == high)
+    return forced
+
+
+def convolve(distributions):
+    """
+    Returns the distribution of the total number of mines, given a list
+    of dictionaries mapping a number of mines to a number of ways.
+    """
+    result = {0: 1}
+    for distribution in distributions:
+        combined = collections.Counter()
+        for a, x in result.items():
+            for b, y in distribution.items():
+                combined[a + b] += x * y
+        result = combined
+    return result
@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+import time
+
+from minesweeper import MinesweeperAI, BitMinesweeperAI
+
+PLAYERS = {cls.__name__: cls for cls in (MinesweeperAI, BitMinesweeperAI)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay a Minesweeper move log, as written by "
+                    "simulate.py --record, through the AI and time how long "
+                    "it takes to add each move to the AI's knowledge."
+    )
+    parser.add_argument("log", help="move log to replay")
+    parser.add_argument("--top", type=int, default=10,
+                        help="number of slowest steps to show")
+    parser.add_argument("--cut", nargs=2, metavar=("STEP", "FILE"),
+                        help="write a shorter log to FILE that starts from "
+                             "a snapshot taken just before step STEP")
+    args = parser.parse_args()
+
+    with open(args.log) as f:
+        log = json.load(f)
+    width = log["snapshot"]["width"]
+    cut = int(args.cut[0]) if args.cut else None
+    if cut is not None and not 0 <= cut < len(log["moves"]):
+        parser.error(f"STEP must be between 0 and {len(log['moves']) - 1}")
+
+    ai = load(log["snapshot"])
+    timings = []
+    for step, (index, count) in enumerate(log["moves"]):
+        if step == cut:
+            save(args.cut[1], ai.snapshot(), log["moves"][step:],
+                 log.get("final"))
+        cell = divmod(index, width)
+        start = time.perf_counter()
+        ai.add_knowledge(cell, count)
+        timings.append((time.perf_counter() - start, step, cell,
+                        len(ai.knowledge)))
+
+    report(timings, args.top)
+
+    # A log with a final snapshot doubles as a regression test
+    if "final" in log:
+        if ai.snapshot() != log["final"]:
+            sys.exit("Final state differs from the recorded one")
+        print("Final state matches the recorded one")
+
+
+def load(snapshot):
+    """Returns an AI restored from `snapshot`."""
+    return PLAYERS[snapshot["ai"]].from_snapshot(snapshot)
+
+
+def save(filename, snapshot, moves, final=None):
+    """Writes a move log starting from `snapshot` to `filename`."""
+    log = {"snapshot": snapshot, "moves": moves}
+    if final is not None:
+        log["final"] = final
+    with open(filename, "w") as f:
+        json.dump(log, f, separators=(",", ":"))
+
+
+def report(timings, top):
+    """Prints the total time and the slowest of the timed steps."""
+    total = sum(seconds for seconds, *_ in timings)
+    print(f"Steps: {len(timings)} in {total * 1000:.3f} ms")
+    if timings:
+        print(f"Mean time per step: {total / len(timings) * 1000:.3f} ms")
+    print(f"{'step':>6}  {'cell':<10}  {'sentences':>9}  {'ms':>10}")
+    for seconds, step, cell, sentences in sorted(timings, reverse=True)[:top]:
+        print(f"{step:>6}  {str(cell):<10}  {sentences:>9}  "
+              f"{seconds * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
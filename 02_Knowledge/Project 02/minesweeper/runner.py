@@ -1,3 +1,4 @@
+import os
 import pygame
 import sys
 import time
@@ -8,6 +9,15 @@ HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Benchmark mode makes AI moves on its own and reports frame times,
+# without a window when run under SDL's dummy video driver
+# Usage: python runner.py --benchmark [height width mines]
+BENCHMARK = len(sys.argv) > 1 and sys.argv[1] == "--benchmark"
+if BENCHMARK:
+    if len(sys.argv) == 5:
+        HEIGHT, WIDTH, MINES = map(int, sys.argv[2:])
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -28,7 +38,7 @@ largeFont = pygame.font.Font(OPEN_SANS, 40)
 BOARD_PADDING = 20
 board_width = ((2 / 3) * width) - (BOARD_PADDING * 2)
 board_height = height - (BOARD_PADDING * 2)
-cell_size = int(min(board_width / WIDTH, board_height / HEIGHT))
+cell_size = max(int(min(board_width / WIDTH, board_height / HEIGHT)), 1)
 board_origin = (BOARD_PADDING, BOARD_PADDING)
 
 # Add images
@@ -37,9 +47,39 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
+# Render the text that never changes once
+numbers = [smallFont.render(str(n), True, BLACK) for n in range(9)]
+statuses = {
+    text: mediumFont.render(text, True, WHITE)
+    for text in ("", "Lost", "Won")
+}
+
+# Rectangles for the cells and buttons
+cells = [
+    [
+        pygame.Rect(
+            board_origin[0] + j * cell_size,
+            board_origin[1] + i * cell_size,
+            cell_size, cell_size
+        )
+        for j in range(WIDTH)
+    ]
+    for i in range(HEIGHT)
+]
+aiButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+resetButton = pygame.Rect(
+    (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
+    (width / 3) - BOARD_PADDING * 2, 50
+)
+playButton = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
+statusArea = pygame.Rect((2 / 3) * width, (2 / 3) * height - 30, width / 3, 60)
+
 # Create game and AI agent
 game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -47,124 +87,140 @@ flags = set()
 lost = False
 
 # Show instructions initially
-instructions = True
+instructions = not BENCHMARK
+
+# Cells whose look changed since they were last drawn, and whether
+# the whole screen has to be drawn again
+dirty = set()
+redraw = True
+status = None
+
+# In benchmark mode, how long each frame took, and whether the AI ran out
+# of moves
+frame_times = []
+finished = False
+
+
+def draw_button(rect, text):
+    """Draws a button with the given text."""
+    buttonText = mediumFont.render(text, True, BLACK)
+    buttonRect = buttonText.get_rect()
+    buttonRect.center = rect.center
+    pygame.draw.rect(screen, WHITE, rect)
+    screen.blit(buttonText, buttonRect)
+
+
+def draw_instructions():
+    """Draws the instructions screen."""
+    screen.fill(BLACK)
+
+    # Title
+    title = largeFont.render("Play Minesweeper", True, WHITE)
+    titleRect = title.get_rect()
+    titleRect.center = ((width / 2), 50)
+    screen.blit(title, titleRect)
+
+    # Rules
+    rules = [
+        "Click a cell to reveal it.",
+        "Right-click a cell to mark it as a mine.",
+        "Mark all mines successfully to win!"
+    ]
+    for i, rule in enumerate(rules):
+        line = smallFont.render(rule, True, WHITE)
+        lineRect = line.get_rect()
+        lineRect.center = ((width / 2), 150 + 30 * i)
+        screen.blit(line, lineRect)
+
+    # Play game button
+    draw_button(playButton, "Play Game")
+
+
+def draw_cell(cell):
+    """Draws one cell of the board and returns its rectangle."""
+    i, j = cell
+    rect = cells[i][j]
+    pygame.draw.rect(screen, GRAY, rect)
+    pygame.draw.rect(screen, WHITE, rect, 3)
+
+    # Add a mine, flag, or number if needed
+    if cell in game.mines and lost:
+        screen.blit(mine, rect)
+    elif cell in flags:
+        screen.blit(flag, rect)
+    elif cell in revealed:
+        neighbors = numbers[game.nearby_mines(cell)]
+        screen.blit(neighbors, neighbors.get_rect(center=rect.center))
+    return rect
+
+
+def draw_status(text):
+    """Draws the game status text and returns the area it covers."""
+    screen.fill(BLACK, statusArea)
+    text = statuses[text]
+    textRect = text.get_rect()
+    textRect.center = ((5 / 6) * width, (2 / 3) * height)
+    screen.blit(text, textRect)
+    return statusArea
+
+
+def make_ai_move():
+    """Asks the AI for a move, and returns it or None if there is none."""
+    global flags
+    move = ai.make_safe_move()
+    if move is None:
+        move = ai.make_random_move()
+        if move is None:
+            dirty.update(flags ^ ai.mines)
+            flags = ai.mines.copy()
+            print("No moves left to make.")
+        else:
+            print("No known safe moves, AI guessing the least risky cell.")
+    else:
+        print("AI making safe move.")
+    return move
+
 
 while True:
+    frame_start = time.perf_counter()
 
     # Check if game quit
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             sys.exit()
 
-    screen.fill(BLACK)
-
     # Show game instructions
     if instructions:
-
-        # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
-
-        # Rules
-        rules = [
-            "Click a cell to reveal it.",
-            "Right-click a cell to mark it as a mine.",
-            "Mark all mines successfully to win!"
-        ]
-        for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
-            lineRect = line.get_rect()
-            lineRect.center = ((width / 2), 150 + 30 * i)
-            screen.blit(line, lineRect)
-
-        # Play game button
-        buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
-        buttonTextRect = buttonText.get_rect()
-        buttonTextRect.center = buttonRect.center
-        pygame.draw.rect(screen, WHITE, buttonRect)
-        screen.blit(buttonText, buttonTextRect)
+        if redraw:
+            draw_instructions()
+            pygame.display.flip()
+            redraw = False
 
         # Check if play button clicked
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1:
             mouse = pygame.mouse.get_pos()
-            if buttonRect.collidepoint(mouse):
+            if playButton.collidepoint(mouse):
                 instructions = False
+                redraw = True
                 time.sleep(0.3)
-
-        pygame.display.flip()
         continue
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
-
-    # AI Move button
-    aiButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = aiButton.center
-    pygame.draw.rect(screen, WHITE, aiButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Reset button
-    resetButton = pygame.Rect(
-        (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
-        (width / 3) - BOARD_PADDING * 2, 50
-    )
-    buttonText = mediumFont.render("Reset", True, BLACK)
-    buttonRect = buttonText.get_rect()
-    buttonRect.center = resetButton.center
-    pygame.draw.rect(screen, WHITE, resetButton)
-    screen.blit(buttonText, buttonRect)
-
-    # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
-    textRect = text.get_rect()
-    textRect.center = ((5 / 6) * width, (2 / 3) * height)
-    screen.blit(text, textRect)
-
     move = None
 
     left, _, right = pygame.mouse.get_pressed()
 
+    # In benchmark mode the AI moves every frame until the game ends
+    if BENCHMARK:
+        if lost or finished or (flags and flags == ai.mines):
+            break
+        move = make_ai_move()
+        if move is None:
+            finished = True
+            redraw = True
+
     # Check for a right-click to toggle flagging
-    if right == 1 and not lost:
+    elif right == 1 and not lost:
         mouse = pygame.mouse.get_pos()
         for i in range(HEIGHT):
             for j in range(WIDTH):
@@ -173,6 +229,7 @@ while True:
                         flags.remove((i, j))
                     else:
                         flags.add((i, j))
+                    dirty.add((i, j))
                     time.sleep(0.2)
 
     elif left == 1:
@@ -180,26 +237,17 @@ while True:
 
         # If AI button clicked, make an AI move
         if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
+            move = make_ai_move()
             time.sleep(0.2)
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
             revealed = set()
             flags = set()
             lost = False
-            continue
+            redraw = True
 
         # User-made move
         elif not lost:
@@ -214,9 +262,40 @@ while True:
     if move:
         if game.is_mine(move):
             lost = True
+            dirty.update(game.mines)
         else:
             nearby = game.nearby_mines(move)
             revealed.add(move)
+            dirty.add(move)
             ai.add_knowledge(move, nearby)
 
-    pygame.display.flip()
+    # Draw everything after a reset, otherwise only what changed
+    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    if redraw:
+        screen.fill(BLACK)
+        for i in range(HEIGHT):
+            for j in range(WIDTH):
+                draw_cell((i, j))
+        draw_button(aiButton, "AI Move")
+        draw_button(resetButton, "Reset")
+        draw_status(text)
+        pygame.display.flip()
+        redraw = False
+    else:
+        rects = [draw_cell(cell) for cell in dirty]
+        if text != status:
+            rects.append(draw_status(text))
+        if rects:
+            pygame.display.update(rects)
+    dirty.clear()
+    status = text
+
+    if BENCHMARK:
+        frame_times.append(time.perf_counter() - frame_start)
+
+# Report how long frames took in benchmark mode
+frame_times.sort()
+print(f"Frames: {len(frame_times)}")
+print(f"Mean frame time: {sum(frame_times) / len(frame_times) * 1000:.3f} ms")
+print(f"Median frame time: {frame_times[len(frame_times) // 2] * 1000:.3f} ms")
+print(f"Slowest frame time: {frame_times[-1] * 1000:.3f} ms")
@@ -0,0 +1,152 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI, BitMinesweeperAI
+
+PLAYERS = {
+    "sets": MinesweeperAI,
+    "bits": BitMinesweeperAI,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games between the game and the AI "
+                    "without a display, and report how the AI did."
+    )
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=None,
+                        help="number of mines (default: from --density)")
+    parser.add_argument("--density", type=float, default=0.125,
+                        help="fraction of cells that are mines")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="game i is played with seed SEED + i")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--ai", choices=PLAYERS, default="sets")
+    parser.add_argument("--sparse", action="store_true",
+                        help="use sparse boards, whose mines are placed "
+                             "after the first click so it is always safe")
+    parser.add_argument("--solver", action="store_true",
+                        help="let the AI solve its sentences as a linear "
+                             "system when it finds no safe move")
+    parser.add_argument("--record", metavar="DIR", default=None,
+                        help="write a move log of each game to DIR, "
+                             "for replay.py")
+    args = parser.parse_args()
+
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    mines = args.mines
+    if mines is None:
+        mines = round(args.height * args.width * args.density)
+    games = [
+        (args.height, args.width, mines, args.sparse, args.ai, args.solver,
+         args.seed + i, args.record)
+        for i in range(args.games)
+    ]
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(play_game, games)
+    elapsed = time.perf_counter() - start
+
+    report(results, elapsed)
+
+
+def play_game(game):
+    """
+    Play one game, given as a tuple (height, width, mines, sparse, ai,
+    solver, seed, record), until the AI wins, hits a mine or has no moves
+    left. If `record` is a directory, the moves are logged to a file in it.
+
+    Return a dictionary of statistics about the game.
+    """
+    height, width, mines, sparse, ai, solver, seed, record = game
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines, sparse=sparse)
+    ai = PLAYERS[ai](height=height, width=width, mines=mines, solver=solver)
+    log = {"snapshot": ai.snapshot(), "moves": []}
+
+    stats = {
+        "won": False,
+        "moves": 0,
+        "deduced": 0,
+        "guesses": 0,
+        "inference": 0,
+        "guessing": 0,
+        "peak_knowledge": 0,
+    }
+    revealed = 0
+    lost = False
+    while revealed < height * width - mines:
+        move = ai.make_safe_move()
+        stats["deduced"] += move is not None
+        if move is None:
+            start = time.perf_counter()
+            move = ai.make_random_move()
+            stats["guessing"] += time.perf_counter() - start
+            stats["guesses"] += 1
+            if move is None:
+                break
+        if game.is_mine(move):
+            lost = True
+            break
+
+        count = game.nearby_mines(move)
+        log["moves"].append([move[0] * width + move[1], count])
+        start = time.perf_counter()
+        ai.add_knowledge(move, count)
+        stats["inference"] += time.perf_counter() - start
+        stats["moves"] += 1
+        stats["peak_knowledge"] = max(
+            stats["peak_knowledge"], len(ai.knowledge)
+        )
+        revealed += 1
+
+    stats["won"] = not lost and (
+        revealed == height * width - mines or ai.mines == game.mines
+    )
+
+    if record:
+        log["final"] = ai.snapshot()
+        with open(os.path.join(record, f"game-{seed}.json"), "w") as f:
+            json.dump(log, f, separators=(",", ":"))
+    return stats
+
+
+def report(results, elapsed):
+    """Print a summary of the statistics of a list of games."""
+    games = len(results)
+    wins = sum(result["won"] for result in results)
+    moves = sum(result["moves"] for result in results)
+    deduced = sum(result["deduced"] for result in results)
+    guesses = sum(result["guesses"] for result in results)
+    inference = sum(result["inference"] for result in results)
+    guessing = sum(result["guessing"] for result in results)
+    thinking = inference + guessing
+
+    print(f"Games: {games} in {elapsed:.2f}s")
+    print(f"Win rate: {wins / games:.1%} ({wins}/{games})")
+    print(f"Moves: {moves}, of which guesses: {guesses}")
+    if thinking:
+        print(f"Moves per second (AI time): {moves / thinking:.0f}")
+        print("Deduced safe moves per second (AI time): "
+              f"{deduced / thinking:.0f}")
+    if moves:
+        print(f"Inference time per move: {inference / moves * 1000:.3f} ms")
+    if guesses:
+        print(f"Time per guess: {guessing / guesses * 1000:.3f} ms")
+    print("Peak knowledge size: "
+          f"{max(result['peak_knowledge'] for result in results)} sentences")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import csv
+import heapq
 import itertools
 import sys
 
@@ -36,6 +37,9 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible numbers of copies of the gene
+GENES = (0, 1, 2)
+
 
 def main():
 
@@ -44,6 +48,26 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    # Compute gene and trait probabilities for each person
+    probabilities = infer_probabilities(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Compute the gene and trait probabilities of each person by summing
+    the joint probability of every combination of genes and traits.
+    This takes about 6^n joint probabilities for n people, so it is only
+    practical for small families.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -83,15 +107,236 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
+
+def infer_probabilities(people):
+    """
+    Compute the gene and trait probabilities of each person exactly, in
+    the form of `enumerate_probabilities`, by message passing on a
+    junction tree of the family's Bayesian network.
+
+    Each person's gene count depends on their parents' gene counts, and
+    each known trait is evidence about the gene count it depends on.
+    Eliminating the people one at a time (those adding fewest new
+    dependencies first) gives one clique per person, linked into a tree.
+    Passing messages up and then down the tree gives every person's gene
+    distribution, in time linear in the size of the family when cliques
+    stay small, as they do for tree-shaped pedigrees.
+    """
+    factors = gene_factors(people)
+    order, separators = elimination_order(people, factors)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Each clique's parent is the clique of the first of its neighbors
+    # to be eliminated after it
+    parent = dict()
+    children = {person: [] for person in order}
+    for person in order:
+        if separators[person]:
+            parent[person] = min(separators[person], key=position.get)
+            children[parent[person]].append(person)
+
+    # Each factor goes to the clique of the first of its people eliminated
+    potentials = {person: Factor((), {(): 1}) for person in order}
+    for factor in factors:
+        first = min(factor.variables, key=position.get)
+        potentials[first] = potentials[first].multiply(factor)
+
+    # Messages from each clique to its parent, from the leaves up
+    up = dict()
+    for person in order:
+        belief = potentials[person]
+        for child in children[person]:
+            belief = belief.multiply(up[child])
+        if person in parent:
+            up[person] = belief.marginalize(separators[person])
+
+    # Messages from each clique to its children, from the roots down
+    down = dict()
+    genes = dict()
+    for person in reversed(order):
+        belief = potentials[person]
+        if person in parent:
+            belief = belief.multiply(down[person])
+
+        # Everything but one child's message, for each child in turn
+        messages = [up[child] for child in children[person]]
+        before = [belief]
+        for message in messages:
+            before.append(before[-1].multiply(message))
+        after = Factor((), {(): 1})
+        for i in reversed(range(len(messages))):
+            child = children[person][i]
+            down[child] = before[i].multiply(after).marginalize(
+                separators[child])
+            after = after.multiply(messages[i])
+
+        genes[person] = before[-1].marginalize({person})
+
+    probabilities = dict()
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        gene = {count: genes[person].table[(count,)] for count in (2, 1, 0)}
+        trait = people[person]["trait"]
+        if trait is None:
+            has_trait = sum(
+                gene[count] * PROBS["trait"][count][True] for count in gene
+            )
+        else:
+            has_trait = 1 if trait else 0
+        probabilities[person] = {
+            "gene": gene,
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
+
+
+class Factor():
+    """
+    Function of the gene counts of some people, stored as a table from
+    tuples of gene counts, in the order of `variables`, to numbers.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def multiply(self, other):
+        """Returns the product of two factors."""
+        variables = self.variables + tuple(
+            variable for variable in other.variables
+            if variable not in self.variables
+        )
+        mine = [variables.index(variable) for variable in self.variables]
+        theirs = [variables.index(variable) for variable in other.variables]
+        table = dict()
+        for genes in itertools.product(GENES, repeat=len(variables)):
+            table[genes] = (
+                self.table[tuple(genes[i] for i in mine)] *
+                other.table[tuple(genes[i] for i in theirs)]
+            )
+        return Factor(variables, table)
+
+    def marginalize(self, keep):
+        """
+        Returns the factor summed over the people not in `keep`, scaled
+        to sum to 1 so long chains of products do not underflow.
+        """
+        variables = tuple(
+            variable for variable in self.variables if variable in keep
+        )
+        positions = [self.variables.index(variable) for variable in variables]
+        table = dict.fromkeys(
+            itertools.product(GENES, repeat=len(variables)), 0
+        )
+        for genes, p in self.table.items():
+            table[tuple(genes[i] for i in positions)] += p
+        total = sum(table.values())
+        if total:
+            table = {genes: p / total for genes, p in table.items()}
+        return Factor(variables, table)
+
+
+def gene_factors(people):
+    """
+    Return the factors of the family's Bayesian network: the probability
+    of each person's gene count given their parents' (or unconditionally,
+    without parents), and the probability of each known trait given the
+    gene count of the person who has it or not.
+    """
+    factors = []
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother and father:
+            table = dict()
+            for genes, mother_genes, father_genes in itertools.product(
+                    GENES, repeat=3):
+                from_mother = inheritance(mother_genes)
+                from_father = inheritance(father_genes)
+                table[(genes, mother_genes, father_genes)] = (
+                    from_mother * from_father if genes == 2 else
+                    from_mother * (1 - from_father) +
+                    (1 - from_mother) * from_father if genes == 1 else
+                    (1 - from_mother) * (1 - from_father)
+                )
+            factors.append(Factor((person, mother, father), table))
+        else:
+            factors.append(Factor(
+                (person,), {(genes,): PROBS["gene"][genes] for genes in GENES}
+            ))
+
+        trait = people[person]["trait"]
+        if trait is not None:
+            factors.append(Factor(
+                (person,),
+                {(genes,): PROBS["trait"][genes][trait] for genes in GENES}
+            ))
+    return factors
+
+
+def inheritance(genes):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes one on to a child.
+    """
+    if genes == 2:
+        return 1 - PROBS["mutation"]
+    if genes == 1:
+        return 0.5
+    return PROBS["mutation"]
+
+
+def elimination_order(people, factors):
+    """
+    Return a tuple (order, separators): an order in which to eliminate
+    the people's gene counts, greedily picking whoever adds the fewest
+    new dependencies between the people left, and for each person the
+    set of people still depending on them when they are eliminated.
+    """
+    neighbors = {person: set() for person in people}
+    for factor in factors:
+        for person in factor.variables:
+            neighbors[person].update(factor.variables)
+            neighbors[person].discard(person)
+
+    def fill(person):
+        """Returns how many new dependencies eliminating `person` adds."""
+        others = list(neighbors[person])
+        return sum(
+            1 for i, a in enumerate(others) for b in others[i + 1:]
+            if b not in neighbors[a]
+        )
+
+    def score(person):
+        """Returns how good a choice `person` is, lowest first."""
+        return fill(person), len(neighbors[person])
+
+    # Eliminating someone only changes the scores of the people who
+    # depended on them and of those people's neighbors, whose neighbors
+    # may have gained new dependencies, so keep scores in a heap and skip
+    # entries that have since changed
+    scores = {person: score(person) for person in people}
+    heap = [(scores[person], i, person) for i, person in enumerate(people)]
+    heapq.heapify(heap)
+    order = []
+    separators = dict()
+    while heap:
+        key, i, person = heapq.heappop(heap)
+        if person not in neighbors or key != scores[person]:
+            continue
+        order.append(person)
+        separators[person] = neighbors.pop(person)
+        for other in separators[person]:
+            neighbors[other].discard(person)
+            neighbors[other].update(separators[person] - {other})
+        changed = set(separators[person])
+        for other in separators[person]:
+            changed.update(neighbors[other])
+        for other in changed:
+            scores[other] = score(other)
+            heapq.heappush(heap, (scores[other], i, other))
+    return order, separators
 
 
 def load_data(filename):
@@ -0,0 +1,267 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+import numpy
+
+import montecarlo
+import outofcore
+from pagerank import (DAMPING, DIRECT_LIMIT, LinkGraph, crawl, crawl_graph,
+                      direct_solve, distance, gauss_seidel, iterate_pagerank,
+                      personalized_pagerank, power_iteration,
+                      quadratic_iteration, sample_pagerank, seed_teleports)
+
+LINKS_PER_PAGE = 5
+SAMPLES = 100000
+ROUNDS = 16
+
+# Teleport vectors ranked at once by personalized_pagerank
+TELEPORTS = 8
+
+# Engines that loop over pages or links in Python, and the most links
+# they are run on by default
+PYTHON_ENGINES = {"crawl", "crawl_graph", "parallel_crawl",
+                  "sample_pagerank", "iterate_pagerank", "gauss_seidel",
+                  "out_of_core", "monte_carlo"}
+PYTHON_LINKS = 1e5
+
+# Engines whose ranks are estimates, and how far the others may be from
+# the reference ranks in total
+SAMPLED = {"sample_pagerank", "monte_carlo"}
+AGREEMENT = 1e-4
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+    <head>
+        <title>{name}</title>
+    </head>
+    <body>
+        <h1>{name}</h1>
+
+        <div>Links:</div>
+        <ul>
+{links}        </ul>
+    </body>
+</html>
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the PageRank engines on synthetic link graphs "
+                    "and check that their ranks agree."
+    )
+    parser.add_argument("--min-links", type=float, default=1e3)
+    parser.add_argument("--max-links", type=float, default=1e7,
+                        help="graphs range from --min-links to this many "
+                             "links, growing tenfold")
+    parser.add_argument("--python-links", type=float, default=PYTHON_LINKS,
+                        help="only run the engines that loop in Python on "
+                             "graphs with at most this many links")
+    parser.add_argument("--kind", choices=GENERATORS, action="append",
+                        help="kind of graph (default: all)")
+    parser.add_argument("--html", metavar="DIR", default=None,
+                        help="also write each graph as an HTML corpus in "
+                             "DIR and time crawling it")
+    parser.add_argument("--memory", action="store_true",
+                        help="record peak memory (slows everything down)")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'graph':<26}  {'engine':<21}  {'seconds':>9}  "
+          f"{'peak MB':>8}  {'error':>9}")
+    links = int(args.min_links)
+    while links <= args.max_links:
+        for kind in args.kind or GENERATORS:
+            rng = numpy.random.default_rng(args.seed)
+            graph = GENERATORS[kind](links // LINKS_PER_PAGE, links, rng)
+            name = f"{kind} {len(graph)}/{len(graph.targets)}"
+
+            # Crawling is one of the engines that loop in Python
+            python = links <= args.python_links
+            corpus = None
+            if args.html and python:
+                corpus = os.path.join(args.html, f"{kind}-{links}")
+                write_corpus(graph, corpus)
+
+            reference, _ = power_iteration(graph, DAMPING, tolerance=1e-10)
+            for engine, rank in engines(graph, corpus, args.samples,
+                                        python).items():
+                ranks, seconds, peak = measure(rank, args.memory)
+                peak = "-" if peak is None else f"{peak / 2 ** 20:.1f}"
+                error = "-" if ranks is None else (
+                    f"{distance(ranks, reference):.2e}")
+                print(f"{name:<26}  {engine:<21}  {seconds:>9.4f}  "
+                      f"{peak:>8}  {error:>9}")
+
+                # Every exact engine has to agree with the reference
+                if (ranks is not None and engine not in SAMPLED
+                        and distance(ranks, reference) > AGREEMENT):
+                    sys.exit(f"{engine} disagrees on {name}")
+        links *= 10
+
+
+def engines(graph, corpus, samples, python=True):
+    """
+    Return a dictionary from engine name to a function of no arguments
+    that ranks `graph` and returns its ranks in graph order, or None for
+    engines that only crawl. The engines in PYTHON_ENGINES are left out
+    unless `python` is set.
+    """
+    pages = graph.pages
+
+    # The first teleport vector is uniform, which gives plain PageRank
+    teleports = [dict.fromkeys(range(len(graph)), 1 / len(graph))]
+    teleports.extend(seed_teleports(
+        graph, [{page} for page in pages[:TELEPORTS - 1]]))
+
+    def in_order(ranks):
+        return [ranks[page] for page in pages]
+
+    def quietly(function, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+
+    def out_of_core():
+        with tempfile.TemporaryDirectory() as directory:
+            store = outofcore.EdgeStore.build(
+                os.path.join(directory, "store"), len(graph),
+                outofcore.graph_edges(graph),
+                budget=outofcore.BUDGET
+            )
+            return outofcore.out_of_core_pagerank(store, DAMPING)[0]
+
+    solvers = dict()
+    if corpus:
+        solvers["crawl"] = lambda: crawl(corpus) and None
+        solvers["crawl_graph"] = lambda: crawl_graph(corpus, 1) and None
+        solvers["parallel_crawl"] = lambda: crawl_graph(corpus) and None
+    if python:
+        dictionary = graph.to_corpus()
+        solvers.update({
+            "sample_pagerank": lambda: in_order(
+                sample_pagerank(dictionary, DAMPING, samples)),
+            "iterate_pagerank": lambda: in_order(
+                quietly(iterate_pagerank, dictionary, DAMPING)),
+        })
+    solvers.update({
+        "power_iteration": lambda: power_iteration(graph, DAMPING)[0],
+        "gauss_seidel": lambda: gauss_seidel(graph, DAMPING)[0],
+        "quadratic": lambda: quadratic_iteration(graph, DAMPING)[0],
+        "personalized_pagerank": lambda: personalized_pagerank(
+            graph, DAMPING, teleports)[0][0],
+        "out_of_core": out_of_core,
+        "monte_carlo": lambda: montecarlo.monte_carlo_pagerank(
+            graph, DAMPING, precision=0, max_rounds=ROUNDS, processes=1)[0],
+    })
+    if len(graph) <= DIRECT_LIMIT:
+        solvers["direct"] = lambda: direct_solve(graph, DAMPING)[0]
+    return {
+        engine: solver for engine, solver in solvers.items()
+        if python or engine not in PYTHON_ENGINES
+    }
+
+
+def measure(function, memory):
+    """
+    Call `function` and return a tuple (result, seconds, peak), where peak
+    is the most memory allocated during the call if `memory` is set.
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def erdos_renyi(pages, links, rng):
+    """Returns a graph of `links` links between random pairs of pages."""
+    return graph_of(pages, rng.integers(pages, size=links),
+                    rng.integers(pages, size=links))
+
+
+def preferential_attachment(pages, links, rng):
+    """
+    Returns a graph where each page links to pages added before it,
+    chosen in proportion to the number of links they already have plus
+    one, so a few pages collect most links as on the web.
+    """
+    per_page = max(links // pages, 1)
+    draws = rng.random((pages, per_page))
+    sources = array("q")
+    targets = array("q")
+
+    # Each page appears once, plus once for every link to it
+    pool = array("q", [0])
+    for page in range(1, pages):
+        chosen = {pool[int(draw * len(pool))] for draw in draws[page].tolist()}
+        sources.extend([page] * len(chosen))
+        targets.extend(chosen)
+        pool.extend(chosen)
+        pool.append(page)
+    return graph_of(pages, numpy.asarray(sources), numpy.asarray(targets))
+
+
+def dangling(pages, links, rng):
+    """
+    Returns a random graph where half of the pages have no links, and
+    the other half link to random pages.
+    """
+    linking = max(pages // 2, 1)
+    sources = rng.integers(linking, size=links)
+    targets = rng.integers(pages, size=links)
+
+    # Shuffle which pages have links
+    order = rng.permutation(pages)
+    return graph_of(pages, order[sources], order[targets])
+
+
+def graph_of(pages, sources, targets):
+    """
+    Returns the LinkGraph of `pages` pages with links from the page
+    numbers in array `sources` to the ones in array `targets`, leaving
+    out links from a page to itself and repeated links.
+    """
+    keep = sources != targets
+    keys = numpy.unique(sources[keep] * pages + targets[keep])
+    sources, targets = numpy.divmod(keys, pages)
+    offsets = numpy.zeros(pages + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(sources, minlength=pages), out=offsets[1:])
+    names = [f"{page}.html" for page in range(pages)]
+    return LinkGraph(names, offsets, targets)
+
+
+def write_corpus(graph, directory):
+    """Writes a LinkGraph as a directory of HTML pages, like corpus0."""
+    os.makedirs(directory, exist_ok=True)
+    for page, name in enumerate(graph.pages):
+        links = "".join(
+            f'            <li><a href="{graph.pages[link]}">'
+            f'{graph.pages[link]}</a></li>\n'
+            for link in graph.links(page)
+        )
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(PAGE.format(name=name, links=links))
+
+
+GENERATORS = {
+    "erdos-renyi": erdos_renyi,
+    "preferential": preferential_attachment,
+    "dangling": dangling,
+}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import math
+import multiprocessing
+import operator
+import random
+import statistics
+import time
+
+from pagerank import DAMPING, cached_graph
+
+PRECISION = 0.001
+CONFIDENCE = 0.95
+ROUNDS_PER_TASK = 8
+MAX_ROUNDS = 100000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate PageRank by Monte Carlo walks, with "
+                    "confidence intervals."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--precision", type=float, default=PRECISION,
+                        help="stop once every interval is this narrow "
+                             "on either side")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    graph, _ = cached_graph(args.corpus)
+    start = time.perf_counter()
+    ranks, errors, rounds = monte_carlo_pagerank(
+        graph, args.damping, args.precision, args.confidence,
+        processes=args.processes, seed=args.seed
+    )
+    print(f"PageRank Results from {rounds} rounds of walks "
+          f"({time.perf_counter() - start:.2f}s, "
+          f"{args.confidence:.0%} confidence)")
+    for page, rank, error in sorted(zip(graph.pages, ranks, errors)):
+        print(f"  {page}: {rank:.4f} ± {error:.4f}")
+
+
+def monte_carlo_pagerank(graph, damping_factor, precision=PRECISION,
+                         confidence=CONFIDENCE, max_rounds=MAX_ROUNDS,
+                         processes=None, seed=None):
+    """
+    Estimate PageRank on a LinkGraph by the complete path Monte Carlo
+    method: every round starts one walk at every page, and each walk
+    follows links like the random surfer but stops wherever the surfer
+    would jump to a random page instead. Every visit to a page counts,
+    and a page's rank is (1 - d) / N times its expected visits per round.
+
+    Rounds are independent, so they are split between `processes`
+    processes (one per CPU by default), each with its own random number
+    generator, and the spread of the rounds gives a confidence interval
+    for each rank. Rounds stop once every interval is within `precision`
+    of its estimate, or after `max_rounds` rounds. Tasks are taken in
+    order, so the result depends only on `seed`, not on the processes.
+
+    Return a tuple (ranks, errors, rounds), where each rank lies within
+    its error of the estimate with probability `confidence`.
+    """
+    n = len(graph)
+    arrays = (graph.offsets.tolist(), graph.targets.tolist(), damping_factor)
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    scale = (1 - damping_factor) / n
+
+    sums = [0] * n
+    squares = [0] * n
+    rounds = 0
+    errors = [math.inf] * n
+    tasks = (
+        (ROUNDS_PER_TASK, f"{seed}-{task}") for task in range(
+            math.ceil(max_rounds / ROUNDS_PER_TASK))
+    )
+
+    if processes == 1:
+        start_walkers(*arrays)
+        results = map(walk_rounds, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, start_walkers, arrays)
+        results = pool.imap(walk_rounds, tasks)
+    try:
+        for task_sums, task_squares in results:
+            sums = list(map(operator.add, sums, task_sums))
+            squares = list(map(operator.add, squares, task_squares))
+            rounds += ROUNDS_PER_TASK
+            if rounds < 2 * ROUNDS_PER_TASK:
+                continue
+
+            # Standard error of the mean visits per round of each page
+            errors = [
+                z * scale * math.sqrt(
+                    max(total2 - total * total / rounds, 0)
+                    / (rounds - 1) / rounds)
+                for total, total2 in zip(sums, squares)
+            ]
+            if max(errors) <= precision:
+                break
+    finally:
+        if pool:
+            pool.terminate()
+
+    ranks = [scale * total / rounds for total in sums]
+    return ranks, errors, rounds
+
+
+def start_walkers(offsets, targets, damping_factor):
+    """Sets the graph walked by `walk_rounds` in this process."""
+    global walk_graph
+    walk_graph = (offsets, targets, damping_factor)
+
+
+def walk_rounds(task):
+    """
+    Run rounds of walks for a task (rounds, seed), and return a tuple
+    (sums, squares) of the total visits to each page and the total of
+    their squares over the rounds.
+    """
+    rounds, seed = task
+    offsets, targets, damping_factor = walk_graph
+    n = len(offsets) - 1
+    uniform = random.Random(seed).random
+
+    sums = [0] * n
+    squares = [0] * n
+    for _ in range(rounds):
+        visits = [0] * n
+        for page in range(n):
+            while True:
+                visits[page] += 1
+                if uniform() >= damping_factor:
+                    break
+                start, end = offsets[page], offsets[page + 1]
+                if end > start:
+                    page = targets[start + int(uniform() * (end - start))]
+                else:
+                    page = int(uniform() * n)
+        sums = list(map(operator.add, sums, visits))
+        squares = list(map(operator.add, squares,
+                           map(operator.mul, visits, visits)))
+    return sums, squares
+
+
+if __name__ == "__main__":
+    main()
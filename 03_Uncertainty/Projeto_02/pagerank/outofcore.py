@@ -0,0 +1,275 @@
+import heapq
+import itertools
+import json
+import multiprocessing
+import operator
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+
+from pagerank import (CACHE, DAMPING, MAX_ITERATIONS, TOLERANCE,
+                      corpus_hash, distance, map_array, page_links,
+                      start_crawler)
+
+# Memory budget in bytes, and rough sizes of what it is spent on: a float
+# in a Python list (pointer and object), five rank-sized lists kept
+# resident, and a link while it is sorted or summed, with some slack
+BUDGET = 256 * 2 ** 20
+FLOAT_BYTES = 32
+RESIDENT_VECTORS = 5
+EDGE_BYTES = 64
+
+# Links read from a sorted run at a time while merging
+MERGE_CHUNK = 1 << 14
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python outofcore.py corpus [budget_mb]")
+    budget = BUDGET
+    if len(sys.argv) == 3:
+        budget = int(float(sys.argv[2]) * 2 ** 20)
+
+    # Links go from the parser straight into the store, so the graph is
+    # never held in memory, only the names of its pages
+    directory = sys.argv[1]
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    )
+    store = os.path.join(CACHE, f"{corpus_hash(directory)}-blocks-{budget}")
+    if not os.path.isdir(store):
+        EdgeStore.build(store, len(pages), crawl_edges(directory, pages),
+                        budget)
+    store = EdgeStore(store)
+
+    start = time.perf_counter()
+    ranks, iterations = out_of_core_pagerank(store, DAMPING)
+    print(f"Ranked {len(ranks)} pages in {iterations} iterations over "
+          f"{len(store.blocks)} blocks ({time.perf_counter() - start:.3f}s)")
+    for page in sorted(range(len(ranks)), key=ranks.__getitem__,
+                       reverse=True)[:10]:
+        print(f"  {pages[page]}: {ranks[page]:.4f}")
+
+
+def crawl_edges(directory, pages, processes=None):
+    """
+    Yields the links between `pages`, the sorted names of the pages of a
+    directory, as (source, target) pairs, parsing the pages like
+    `crawl_graph` but as they are needed.
+    """
+    ids = {page: i for i, page in enumerate(pages)}
+    with multiprocessing.Pool(processes, start_crawler,
+                              (directory, ids)) as pool:
+        links = pool.imap(page_links, pages, chunksize=64)
+        for source, targets in enumerate(links):
+            for target in targets:
+                yield source, target
+
+
+def graph_edges(graph):
+    """Yields the links of a LinkGraph as (source, target) pairs."""
+    offsets = graph.offsets
+    for source in range(len(graph)):
+        for target in graph.targets[offsets[source]:offsets[source + 1]]:
+            yield source, target
+
+
+class EdgeStore():
+    """
+    Links between pages kept on disk in blocks, for graphs too large to
+    keep in memory.
+
+    Links are sorted by the page they point to and cut into blocks small
+    enough for the memory budget. Each block covers a range of target
+    pages starting at `first`, in compressed sparse row form: the sources
+    of the links into page first + i are sources[offsets[i]:offsets[i + 1]].
+    A page with more links than fit in one block continues in the next.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "store.json")) as f:
+            metadata = json.load(f)
+        self.pages = metadata["pages"]
+        self.budget = metadata["budget"]
+        self.blocks = metadata["blocks"]
+        self.degrees = map_array(os.path.join(path, "degrees"), "q")
+
+    @classmethod
+    def build(cls, path, pages, edges, budget=BUDGET):
+        """
+        Writes the links yielded as (source, target) pairs by `edges`
+        between `pages` pages to a new store in directory `path`.
+
+        The links are sorted out of core: runs that fit in the budget
+        are sorted in memory and written out, then merged into blocks.
+        The store is built in a temporary directory and renamed into
+        place, so a build that is cut short leaves no store behind.
+        """
+        edges_per_block = block_size(pages, budget)
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        temporary = tempfile.mkdtemp(dir=parent)
+        try:
+            cls.write(temporary, pages, edges, budget, edges_per_block)
+        except BaseException:
+            shutil.rmtree(temporary)
+            raise
+        try:
+            os.rename(temporary, path)
+        except OSError:
+            shutil.rmtree(temporary)
+        return cls(path)
+
+    @staticmethod
+    def write(path, pages, edges, budget, edges_per_block):
+        """Writes the files of a store to the existing directory `path`."""
+        degrees = array("q", bytes(8 * pages))
+        with tempfile.TemporaryDirectory(dir=path) as runs:
+
+            # Sort runs of links by target, then source, as single keys
+            files = []
+            run = []
+            for source, target in edges:
+                degrees[source] += 1
+                run.append(target * pages + source)
+                if len(run) == edges_per_block:
+                    files.append(write_run(runs, len(files), run))
+                    run = []
+            if run or not files:
+                files.append(write_run(runs, len(files), run))
+
+            blocks = []
+            merged = heapq.merge(*[read_run(file) for file in files])
+            while True:
+                keys = list(itertools.islice(merged, edges_per_block))
+                if not keys:
+                    break
+                blocks.append(write_block(path, len(blocks), keys, pages))
+
+        with open(os.path.join(path, "degrees"), "wb") as f:
+            f.write(degrees)
+        with open(os.path.join(path, "store.json"), "w") as f:
+            json.dump({"pages": pages, "budget": budget, "blocks": blocks}, f)
+
+    def read_blocks(self):
+        """
+        Yields (first, offsets, sources) for each block, memory-mapped
+        from disk one at a time.
+        """
+        for i, (first, _) in enumerate(self.blocks):
+            offsets = map_array(os.path.join(self.path, f"offsets-{i}"), "q")
+            sources = map_array(os.path.join(self.path, f"sources-{i}"), "q")
+            yield first, offsets, sources
+
+
+def block_size(pages, budget):
+    """
+    Returns how many links fit in a block after the rank vectors of
+    `pages` pages, or raises ValueError if the vectors alone do not fit.
+    """
+    resident = pages * FLOAT_BYTES * RESIDENT_VECTORS
+    if resident >= budget:
+        raise ValueError(
+            f"{pages} pages need more than {resident} bytes, over the "
+            f"budget of {budget} bytes"
+        )
+    return max((budget - resident) // EDGE_BYTES, 1)
+
+
+def write_run(directory, number, keys):
+    """Writes a sorted run of link keys and returns its file name."""
+    filename = os.path.join(directory, f"run-{number}")
+    keys.sort()
+    with open(filename, "wb") as f:
+        f.write(array("q", keys))
+    return filename
+
+
+def read_run(filename):
+    """Yields the link keys of a run, a chunk at a time."""
+    with open(filename, "rb") as f:
+        while True:
+            keys = array("q")
+            try:
+                keys.fromfile(f, MERGE_CHUNK)
+            except EOFError:
+                pass
+            if not keys:
+                break
+            yield from keys
+
+
+def write_block(path, number, keys, pages):
+    """
+    Writes sorted link keys as block `number` of a store in `path`, and
+    returns the block's range of target pages as [first, end].
+    """
+    first = keys[0] // pages
+    end = keys[-1] // pages + 1
+    counts = [0] * (end - first)
+    for key in keys:
+        counts[key // pages - first] += 1
+    offsets = array("q", itertools.accumulate(counts, initial=0))
+    sources = array("q", (key % pages for key in keys))
+    with open(os.path.join(path, f"offsets-{number}"), "wb") as f:
+        f.write(offsets)
+    with open(os.path.join(path, f"sources-{number}"), "wb") as f:
+        f.write(sources)
+    return [first, end]
+
+
+def out_of_core_pagerank(store, damping_factor, tolerance=TOLERANCE,
+                         max_iterations=MAX_ITERATIONS, callback=None):
+    """
+    Compute PageRank like `power_iteration`, on the links of an EdgeStore,
+    streaming its blocks from disk in every iteration so only the rank
+    vectors and one block are in memory at a time.
+
+    Return a tuple (ranks, iterations).
+    """
+    n = store.pages
+    degrees = store.degrees
+    share = [damping_factor / degree if degree else 0.0 for degree in degrees]
+    dangling = [page for page in range(n) if not degrees[page]]
+
+    ranks = [1 / n] * n
+    iteration = 0
+    while iteration < max_iterations:
+        start = time.perf_counter()
+        passed = list(map(operator.mul, ranks, share))
+        linked = [0.0] * n
+        for first, offsets, sources in store.read_blocks():
+            totals = list(itertools.accumulate(
+                map(passed.__getitem__, sources), initial=0.0))
+            sums = list(map(operator.sub,
+                            map(totals.__getitem__, offsets[1:]),
+                            map(totals.__getitem__, offsets[:-1])))
+
+            # A page cut between blocks adds to what it already has
+            sums[0] += linked[first]
+            linked[first:first + len(sums)] = sums
+        del passed
+
+        rest = 1 - damping_factor + damping_factor * sum(
+            map(ranks.__getitem__, dangling))
+        new_ranks = list(map((rest / n).__add__, linked))
+        del linked
+
+        iteration += 1
+        residual = distance(new_ranks, ranks)
+        ranks = new_ranks
+        if callback:
+            callback(iteration, residual, time.perf_counter() - start)
+        if residual < tolerance:
+            break
+
+    return ranks, iteration
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,187 @@
+import hashlib
+import itertools
+import mmap
+import multiprocessing
+import operator
 import os
 import random
 import re
+import shutil
 import sys
+import tempfile
+import time
+from array import array
+
+import numpy
+import scipy.sparse
+import scipy.sparse.linalg
 
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 10000
+
+# How often extrapolating solvers extrapolate, and the most pages a graph
+# may have to be solved directly
+EXTRAPOLATION_PERIOD = 10
+DIRECT_LIMIT = 5000
+
+# Links in HTML pages, and how much of a page to read at once
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+CHUNK_SIZE = 1 << 16
+
+# Where crawled graphs and their ranks are saved
+CACHE = ".pagerank_cache"
 
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    graph, path = cached_graph(sys.argv[1])
+    visits = random_surf(graph, DAMPING, SAMPLES)
+    ranks = {page: count / SAMPLES for page, count in zip(graph.pages, visits)}
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = dict(zip(graph.pages, cached_ranks(graph, DAMPING, path)))
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
+def corpus_hash(directory):
+    """Return a SHA-256 hex digest of the names and contents of the pages."""
+    digest = hashlib.sha256()
+    for page in sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    ):
+        contents = hashlib.sha256()
+        with open(os.path.join(directory, page), "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                contents.update(chunk)
+        digest.update(page.encode("utf-8") + b"\0" + contents.digest())
+    return digest.hexdigest()
+
+
+def cached_graph(directory, cache=CACHE):
+    """
+    Return a tuple (graph, path) of the LinkGraph of a directory of HTML
+    pages and the directory in `cache` where it is saved.
+
+    Graphs are saved under the hash of the pages they come from, so an
+    unchanged corpus is loaded instead of crawled again.
+    """
+    path = os.path.join(cache, corpus_hash(directory))
+    if not os.path.isdir(path):
+        graph = crawl_graph(directory)
+
+        # Save to a temporary directory first so no one sees half a graph
+        os.makedirs(cache, exist_ok=True)
+        temporary = tempfile.mkdtemp(dir=cache)
+        graph.save(temporary)
+        try:
+            os.rename(temporary, path)
+        except OSError:
+            shutil.rmtree(temporary)
+    return LinkGraph.load(path), path
+
+
+def cached_ranks(graph, damping_factor, path):
+    """
+    Return the PageRank of each page of `graph`, saved in `path` by
+    `cached_graph`, computing and saving them first if needed.
+    """
+    filename = os.path.join(path, f"ranks-{damping_factor}-{TOLERANCE}")
+    ranks = array("d")
+    if os.path.exists(filename):
+        with open(filename, "rb") as f:
+            ranks.frombytes(f.read())
+        return ranks.tolist()
+
+    ranks.frombytes(power_iteration(graph, damping_factor)[0].tobytes())
+    temporary = f"{filename}.{os.getpid()}"
+    with open(temporary, "wb") as f:
+        f.write(ranks)
+    os.replace(temporary, filename)
+    return ranks.tolist()
+
+
+def map_array(filename, typecode):
+    """Return a memory-mapped file as a sequence of `typecode` items."""
+    with open(filename, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return array(typecode)
+        return memoryview(
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        ).cast(typecode)
+
+
 def crawl(directory):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
     """
-    pages = dict()
+    return crawl_graph(directory, processes=1).to_corpus()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
 
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+def crawl_graph(directory, processes=None):
+    """
+    Parse a directory of HTML pages into a LinkGraph of the links between
+    them, leaving out links from a page to itself or to missing pages.
 
-    return pages
+    Pages are numbered in order of name before any file is read, so each
+    file can be parsed on its own, by a pool of `processes` processes
+    (one per CPU by default), straight into a list of page numbers.
+    """
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    )
+    ids = {page: i for i, page in enumerate(pages)}
+
+    if processes == 1:
+        start_crawler(directory, ids)
+        return LinkGraph.from_links(pages, map(page_links, pages))
+    with multiprocessing.Pool(processes, start_crawler,
+                              (directory, ids)) as pool:
+        links = pool.imap(page_links, pages, chunksize=64)
+        return LinkGraph.from_links(pages, links)
+
+
+def start_crawler(directory, ids):
+    """Sets the corpus read by `page_links` in this process."""
+    global corpus_directory, page_ids
+    corpus_directory = directory
+    page_ids = ids
+
+
+def page_links(page):
+    """Return the sorted numbers of the pages linked to by `page`."""
+    links = extract_links(os.path.join(corpus_directory, page))
+    links.discard(page)
+    return sorted(map(page_ids.__getitem__, page_ids.keys() & links))
+
+
+def extract_links(path):
+    """
+    Return the set of addresses linked to by the HTML file at `path`,
+    reading it a chunk at a time. Chunks are only cut after a ">", which
+    cannot occur in a link before its address.
+    """
+    links = set()
+    rest = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            text = rest + chunk
+            end = text.rfind(">") + 1 if chunk else len(text)
+            links.update(LINK.findall(text, 0, end))
+            rest = text[end:]
+            if not chunk:
+                break
+    return links
 
 
 def transition_model(corpus, page, damping_factor):
@@ -80,88 +216,553 @@ def transition_model(corpus, page, damping_factor):
 
     return p_dist
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, walkers=1):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
+    With more than one walker, the samples are shared between that many
+    surfers moving together, as in `surf_together`.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    def normalize_visits(access, n):
-        return {page_name: (access_num / n) for page_name, access_num in access.items()}
+    graph = LinkGraph.from_corpus(corpus)
+    if walkers > 1:
+        visits = surf_together(graph, damping_factor, n, walkers)
+    else:
+        visits = random_surf(graph, damping_factor, n)
+    return {page: count / n for page, count in zip(graph.pages, visits)}
 
 
-    # Inicializar o dicionário 'visits' com um loop for
-    access = {}
-    for page_name in corpus:
-        access[page_name] = 0
+def random_surf(graph, damping_factor, n):
+    """
+    Take `n` samples of a random surfer on a LinkGraph, starting at a
+    random page, and return the number of visits to each page in graph
+    order.
+
+    The transition model is a mix of two uniform choices: a random link
+    of the current page with probability `damping_factor`, and any page
+    otherwise (always, for a page without links). Sampling whichever one
+    applies takes constant time, with no distribution to build per step.
+    """
+    pages = len(graph)
+    starts = graph.offsets.tolist()
+    degrees = graph.out_degrees()
+    targets = graph.targets.tolist()
+    visits = [0] * pages
+    uniform = random.random
+
+    if not n:
+        return visits
+    page = int(uniform() * pages)
+    visits[page] += 1
+    for _ in range(n - 1):
+        degree = degrees[page]
+        if degree and uniform() < damping_factor:
+            page = targets[starts[page] + int(uniform() * degree)]
+        else:
+            page = int(uniform() * pages)
+        visits[page] += 1
+
+    return visits
+
+
+def surf_together(graph, damping_factor, n, walkers, seed=None):
+    """
+    Take `n` samples of `walkers` random surfers on a LinkGraph, each
+    starting at a random page, and return the number of visits to each
+    page in graph order.
+
+    The surfers move in lockstep as an array of positions, so each step
+    of all of them is a few NumPy operations on the graph's offsets and
+    targets rather than a loop in Python, and the samples come from many
+    short walks rather than one long one.
+    """
+    pages = len(graph)
+    offsets = numpy.asarray(graph.offsets, dtype=numpy.int64)
+    targets = numpy.asarray(graph.targets, dtype=numpy.int64)
+    degrees = numpy.diff(offsets)
+    rng = numpy.random.default_rng(seed)
+
+    visits = numpy.zeros(pages, dtype=numpy.int64)
+    visited = []
+    pending = 0
+    positions = rng.integers(pages, size=walkers)
+    taken = 0
+    while taken < n:
+        visited.append(positions[:n - taken])
+        taken += len(visited[-1])
+
+        # Count visits in batches at least as long as there are pages
+        pending += len(visited[-1])
+        if pending >= pages or taken == n:
+            visits += numpy.bincount(numpy.concatenate(visited),
+                                     minlength=pages)
+            visited = []
+            pending = 0
+
+        # Each surfer follows a random link or jumps to a random page
+        degree = degrees[positions]
+        follow = (degree > 0) & (rng.random(walkers) < damping_factor)
+        links = offsets[positions[follow]] + (
+            rng.random(int(follow.sum())) * degree[follow]
+        ).astype(numpy.int64)
+        positions = rng.integers(pages, size=walkers)
+        positions[follow] = targets[links]
+
+    return visits.tolist()
 
-    atual_page = random.choice(list(access.keys()))
-    access[atual_page] += 1
 
+def iterate_pagerank(corpus, damping_factor):
+    """
+    Return PageRank values for each page by iteratively updating
+    PageRank values until convergence.
 
-    # Loop para as próximas n-1 amostras
-    for i in range(n - 1):
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, iteration = power_iteration(graph, damping_factor)
 
-        trans_model = transition_model(corpus, atual_page, damping_factor)
-        page_list, probabilities = zip(*trans_model.items())
+    print(f"Number of iterations to converge: {iteration} ")
 
-        rand_val = random.random()
-        t_prob = 0
+    return dict(zip(graph.pages, ranks.tolist()))
 
-        for j, probability in enumerate(probabilities):
-            t_prob += probability
-            if rand_val <= t_prob:
-                atual_page = page_list[j]
-                break
 
-        access[atual_page] += 1
+class LinkGraph():
+    """
+    Links between pages in compressed sparse row form. Pages are
+    numbered by their position in `pages`, and the pages linked to by
+    page i are targets[offsets[i]:offsets[i + 1]].
+    """
 
-    # Normalizar as visitas usando o número de amostras (n)
-    page_ranks = normalize_visits(access, n)
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """Returns the graph of a corpus as returned by `crawl`."""
+        pages = sorted(corpus)
+        ids = {page: i for i, page in enumerate(pages)}
+        return cls.from_links(pages, (
+            sorted(ids[link] for link in corpus[page]) for page in pages
+        ))
+
+    @classmethod
+    def from_links(cls, pages, links):
+        """
+        Returns the graph of `pages`, where `links` yields the numbers of
+        the pages linked to by each page in turn.
+        """
+        offsets = array("q", [0])
+        targets = array("q")
+        for page_links in links:
+            targets.extend(page_links)
+            offsets.append(len(targets))
+        return cls(pages, offsets, targets)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns the graph saved in directory `path`. The offsets and
+        targets are memory-mapped rather than read.
+        """
+        with open(os.path.join(path, "pages"), encoding="utf-8") as f:
+            names = f.read()
+        pages = names.split("\0") if names else []
+        offsets = map_array(os.path.join(path, "offsets"), "q")
+        targets = map_array(os.path.join(path, "targets"), "q")
+        return cls(pages, offsets, targets)
+
+    def save(self, path):
+        """
+        Saves the graph in directory `path`: the page names separated by
+        NUL characters, and the offsets and targets as raw 8-byte
+        integers in the machine's byte order.
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "pages"), "w", encoding="utf-8") as f:
+            f.write("\0".join(self.pages))
+        with open(os.path.join(path, "offsets"), "wb") as f:
+            f.write(self.offsets)
+        with open(os.path.join(path, "targets"), "wb") as f:
+            f.write(self.targets)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, page):
+        """Returns the numbers of the pages linked to by page `page`."""
+        return self.targets[self.offsets[page]:self.offsets[page + 1]]
+
+    def out_degrees(self):
+        """Returns the number of links out of each page."""
+        offsets = self.offsets
+        return [offsets[i + 1] - offsets[i] for i in range(len(self))]
+
+    def transpose(self):
+        """Returns the graph with every link reversed."""
+        n = len(self)
+        counts = [0] * (n + 1)
+        for target in self.targets:
+            counts[target + 1] += 1
+        offsets = list(itertools.accumulate(counts))
+
+        # Place the sources of the links into each page in order
+        sources = [0] * len(self.targets)
+        position = offsets[:n]
+        degrees = self.out_degrees()
+        targets = iter(self.targets)
+        for source in range(n):
+            for target in itertools.islice(targets, degrees[source]):
+                sources[position[target]] = source
+                position[target] += 1
+        return LinkGraph(self.pages, array("q", offsets),
+                         array("q", sources))
+
+    def to_corpus(self):
+        """Returns the graph as a dictionary like the ones from `crawl`."""
+        pages = self.pages
+        return {
+            page: {pages[target] for target in self.links(i)}
+            for i, page in enumerate(pages)
+        }
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, ranks=None, callback=None):
+    """
+    Compute PageRank on a LinkGraph by power iteration, until the ranks
+    change by less than `tolerance` in total (L1 norm). Iteration starts
+    from `ranks` if given, such as the ranks before the graph changed,
+    and from equal ranks otherwise.
 
-    return page_ranks
+    If given, `callback(iteration, residual, seconds)` is called after
+    every iteration with the change in the ranks and the time it took.
 
-def iterate_pagerank(corpus, damping_factor):
+    Return a tuple (ranks, iterations), where ranks is an array of the
+    PageRank of each page in graph order.
     """
-    Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    step = pagerank_step(graph, damping_factor)
+    ranks = starting_ranks(graph, ranks)
+    iteration = 0
+    while iteration < max_iterations:
+        start = time.perf_counter()
+        new_ranks = step(ranks)
+        iteration += 1
+        residual = distance(new_ranks, ranks)
+        ranks = new_ranks
+        if callback:
+            callback(iteration, residual, time.perf_counter() - start)
+        if residual < tolerance:
+            break
 
-    Return a dictionary where keys are page names, and values are
-    their estimated PageRank value (a value between 0 and 1). All
-    PageRank values should sum to 1.
+    return ranks, iteration
+
+
+def pagerank_step(graph, damping_factor):
     """
-    max_iterations = 10000
-    convergence_threshold = 0.001
+    Return a function that takes an array of ranks and returns the ranks
+    after one step of power iteration on a LinkGraph. It also steps every
+    column of a matrix of ranks at once.
+
+    Each page passes damping_factor times its rank on evenly to the pages
+    it links to, which is one product with the sparse matrix from
+    `link_matrix`. Pages without links would pass theirs on to every
+    page, which adds the same amount to every rank, so instead of storing
+    those links their ranks are summed once per step.
+    """
+    n = len(graph)
+    links, dangling = link_matrix(graph, damping_factor)
 
-    num_pages = len(corpus)
-    initial_rank = 1 / num_pages
-    random_prob = (1 - damping_factor) / num_pages
-    ranks = {page: initial_rank for page in corpus}
-    iteration = 0
-    max_rank_change = convergence_threshold + 1  # set an initial value greater than the threshold
+    def step(ranks):
+        rest = 1 - damping_factor + damping_factor * (dangling @ ranks)
+        return links @ ranks + rest / n
+
+    return step
+
+
+def link_matrix(graph, damping_factor):
+    """
+    Return a tuple (links, dangling) describing a step of PageRank on a
+    LinkGraph. links is a SciPy CSR matrix where links[i, j] is the share
+    of page j's rank that page j passes to page i, damping_factor over
+    its number of links, and dangling is 1 for each page without links
+    and 0 for the others.
+    """
+    n = len(graph)
+    offsets = numpy.asarray(graph.offsets, dtype=numpy.int64)
+    degrees = numpy.diff(offsets)
+    share = damping_factor / numpy.maximum(degrees, 1)
+    links = scipy.sparse.csr_matrix(
+        (numpy.repeat(share, degrees),
+         numpy.asarray(graph.targets, dtype=numpy.int64), offsets),
+        shape=(n, n)
+    ).T.tocsr()
+    return links, (degrees == 0).astype(float)
+
+
+def starting_ranks(graph, ranks=None):
+    """
+    Return `ranks` as an array to start iterating from, or equal ranks
+    for every page of `graph` if not given.
+    """
+    if ranks is None:
+        return numpy.full(len(graph), 1 / len(graph))
+    return numpy.array(ranks, dtype=float)
 
-    while max_rank_change > convergence_threshold and iteration < max_iterations:
-        new_ranks = {}
-        for page in corpus:
-            surfing_prob = sum(ranks[other_page] / len(corpus[other_page]) for other_page in corpus if
-                               page in corpus[other_page]) + sum(
-                ranks[other_page] * initial_rank for other_page in corpus if not corpus[other_page])
-            new_rank = random_prob + damping_factor * surfing_prob
-            new_ranks[page] = new_rank
 
-        normalization_factor = sum(new_ranks.values())
-        new_ranks = {page: rank / normalization_factor for page, rank in new_ranks.items()}
+def personalized_pagerank(graph, damping_factor, teleports,
+                          tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Compute personalized PageRank on a LinkGraph for every teleport vector
+    in `teleports`: dictionaries from page numbers to the probability of
+    jumping to that page, such as the ones from `seed_teleports`.
+
+    The vectors are the columns of one dense matrix of ranks, and each
+    step multiplies it by the sparse matrix of links at once, so a batch
+    of vectors costs far less than ranking them one at a time. Steps
+    continue until every vector changes by less than `tolerance` in total.
 
-        max_rank_change = max(abs(new_ranks[page] - ranks[page]) for page in corpus)
+    Return a tuple (ranks, iterations), where ranks is an array with a
+    row of ranks in graph order for each teleport vector.
+    """
+    n = len(graph)
+    links, dangling = link_matrix(graph, damping_factor)
+
+    # Teleport vectors are sparse, so keep only their nonzero entries
+    pages, columns, weights = [], [], []
+    for column, teleport in enumerate(teleports):
+        pages.extend(teleport)
+        columns.extend([column] * len(teleport))
+        weights.extend(teleport.values())
+    pages = numpy.array(pages, dtype=numpy.int64)
+    columns = numpy.array(columns, dtype=numpy.int64)
+    weights = numpy.array(weights, dtype=float)
+
+    ranks = numpy.zeros((n, len(teleports)))
+    ranks[pages, columns] = weights
+    iteration = 0
+    while len(teleports) and iteration < max_iterations:
+        iteration += 1
+
+        # Pages without links jump like the surfer, by each column's vector
+        rest = 1 - damping_factor + damping_factor * (dangling @ ranks)
+        new_ranks = links @ ranks
+        new_ranks[pages, columns] += weights * rest[columns]
+
+        ranks -= new_ranks
+        numpy.abs(ranks, out=ranks)
+        residual = ranks.sum(0).max()
         ranks = new_ranks
+        if residual < tolerance:
+            break
+
+    return numpy.ascontiguousarray(ranks.T), iteration
+
+
+def seed_teleports(graph, seed_sets):
+    """
+    Return a teleport vector for each set of page names in `seed_sets`,
+    where the surfer jumps to one of the seed pages at random. Raises
+    ValueError for an empty set, which gives the surfer nowhere to jump.
+    """
+    ids = {page: i for i, page in enumerate(graph.pages)}
+    teleports = []
+    for seeds in seed_sets:
+        if not seeds:
+            raise ValueError(f"seed set {len(teleports)} is empty")
+        teleports.append({ids[page]: 1 / len(seeds) for page in seeds})
+    return teleports
+
+
+def gauss_seidel(graph, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS, ranks=None, callback=None):
+    """
+    Compute PageRank on a LinkGraph like `power_iteration`, but update the
+    ranks in place, so each page already uses the new ranks of the pages
+    before it. That takes fewer iterations, though each one is a loop
+    over the pages in Python rather than in C.
+    """
+    n = len(graph)
+    links, _ = link_matrix(graph, damping_factor)
+    sources = links.indices.tolist()
+    offsets = links.indptr.tolist()
+    degrees = graph.out_degrees()
+    share = [damping_factor / degree if degree else 0.0 for degree in degrees]
+    teleport = (1 - damping_factor) / n
+
+    ranks = starting_ranks(graph, ranks).tolist()
+    passed = list(map(operator.mul, ranks, share))
+    dangling = sum(rank for rank, degree in zip(ranks, degrees) if not degree)
+    iteration = 0
+    while iteration < max_iterations:
+        start = time.perf_counter()
+        residual = 0
+        for page in range(n):
+            rank = teleport + damping_factor * dangling / n + sum(
+                map(passed.__getitem__,
+                    sources[offsets[page]:offsets[page + 1]]))
+            residual += abs(rank - ranks[page])
+            if not degrees[page]:
+                dangling += rank - ranks[page]
+            ranks[page] = rank
+            passed[page] = rank * share[page]
         iteration += 1
+        if callback:
+            callback(iteration, residual, time.perf_counter() - start)
+        if residual < tolerance:
+            break
 
-    print(f"Number of iterations to converge: {iteration} ")
+    ranks = numpy.array(ranks)
+    return ranks / ranks.sum(), iteration
+
+
+def aitken_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                     max_iterations=MAX_ITERATIONS, ranks=None, callback=None,
+                     period=EXTRAPOLATION_PERIOD):
+    """
+    Compute PageRank on a LinkGraph like `power_iteration`, but every
+    `period` iterations replace the ranks with their Aitken extrapolation,
+    which removes the slowest-decaying part of the error when a single
+    real eigenvalue dominates it.
+    """
+    return extrapolated_iteration(
+        graph, damping_factor, aitken_extrapolation, 3, tolerance,
+        max_iterations, ranks, callback, period
+    )
+
+
+def quadratic_iteration(graph, damping_factor, tolerance=TOLERANCE,
+                        max_iterations=MAX_ITERATIONS, ranks=None,
+                        callback=None, period=EXTRAPOLATION_PERIOD):
+    """
+    Compute PageRank on a LinkGraph like `power_iteration`, but every
+    `period` iterations replace the ranks with their quadratic
+    extrapolation, which removes the error along the two eigenvectors
+    after the first, even when their eigenvalues are complex.
+    """
+    return extrapolated_iteration(
+        graph, damping_factor, quadratic_extrapolation, 4, tolerance,
+        max_iterations, ranks, callback, period
+    )
+
+
+def extrapolated_iteration(graph, damping_factor, extrapolate, needed,
+                           tolerance, max_iterations, ranks, callback, period):
+    """
+    Run power iteration on a LinkGraph, replacing the ranks every `period`
+    iterations with `extrapolate` applied to the last `needed` iterates.
+    Return a tuple (ranks, iterations) like `power_iteration`.
+    """
+    step = pagerank_step(graph, damping_factor)
+    ranks = starting_ranks(graph, ranks)
+    history = [ranks]
+    iteration = 0
+    while iteration < max_iterations:
+        start = time.perf_counter()
+        new_ranks = step(ranks)
+        iteration += 1
+        residual = distance(new_ranks, ranks)
+        ranks = new_ranks
+        history = history[1 - needed:] + [ranks]
+        if iteration % period == 0 and len(history) == needed:
+            ranks = extrapolate(*history)
+            history = [ranks]
+        if callback:
+            callback(iteration, residual, time.perf_counter() - start)
+        if residual < tolerance:
+            break
+
+    return ranks, iteration
+
+
+def aitken_extrapolation(first, second, third):
+    """
+    Return the Aitken extrapolation of three successive rank vectors,
+    keeping the last ranks wherever extrapolating would not help.
+    """
+    curvature = third - 2 * second + first
+    step = numpy.divide((third - second) ** 2, curvature,
+                        out=numpy.zeros_like(third), where=curvature != 0)
+    ranks = numpy.where(third - step > 0, third - step, third)
+    return ranks / ranks.sum()
+
+
+def quadratic_extrapolation(first, second, third, fourth):
+    """
+    Return the quadratic extrapolation (Kamvar et al.) of four successive
+    rank vectors: the combination of the last three that cancels the
+    best-fitting polynomial of degree two in the rank differences.
+    """
+    y1, y2, y3 = second - first, third - first, fourth - first
+
+    # Least squares for gamma1 * y1 + gamma2 * y2 = -y3
+    a11, a12, a22 = y1 @ y1, y1 @ y2, y2 @ y2
+    b1, b2 = -(y1 @ y3), -(y2 @ y3)
+    determinant = a11 * a22 - a12 * a12
+    if not determinant:
+        return fourth
+    gamma1 = (b1 * a22 - b2 * a12) / determinant
+    gamma2 = (a11 * b2 - a12 * b1) / determinant
+
+    beta0, beta1 = gamma1 + gamma2 + 1, gamma2 + 1
+    ranks = beta0 * second + beta1 * third + fourth
+    return ranks / ranks.sum()
+
+
+def direct_solve(graph, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS, ranks=None, callback=None,
+                 max_pages=DIRECT_LIMIT):
+    """
+    Compute PageRank on a LinkGraph exactly, by solving a sparse linear
+    system with SciPy's sparse LU solver. It takes the same arguments as
+    `power_iteration`, but as it does not iterate it ignores `tolerance`,
+    `max_iterations` and `ranks`.
+
+    The ranks satisfy r = L r + c / N, where L is the matrix from
+    `link_matrix` and c is the same for every page: the teleport share
+    plus what pages without links pass on. So r is the solution x of
+    (I - L) x = 1, scaled to sum to 1, and the dense part never has to
+    be stored.
+
+    Fill-in makes the solve slow on graphs with little structure, so it
+    raises ValueError beyond `max_pages` pages.
+    """
+    n = len(graph)
+    if n > max_pages:
+        raise ValueError(f"{n} pages is too many to solve directly")
+    start = time.perf_counter()
+
+    links, _ = link_matrix(graph, damping_factor)
+    system = (scipy.sparse.identity(n, format="csc") - links).tocsc()
+    ranks = scipy.sparse.linalg.spsolve(system, numpy.ones(n))
+    ranks /= ranks.sum()
+
+    if callback:
+        residual = distance(pagerank_step(graph, damping_factor)(ranks), ranks)
+        callback(1, residual, time.perf_counter() - start)
+    return ranks, 1
+
+
+def distance(ranks, other):
+    """Return the L1 distance between two sequences of ranks."""
+    return float(numpy.abs(numpy.subtract(ranks, other)).sum())
+
+
+# Ways of computing PageRank on a LinkGraph, by name
+SOLVERS = {
+    "power": power_iteration,
+    "gauss-seidel": gauss_seidel,
+    "aitken": aitken_iteration,
+    "quadratic": quadratic_iteration,
+    "direct": direct_solve,
+}
 
-    return ranks
 
 if __name__ == "__main__":
     print(crawl("corpus0"))
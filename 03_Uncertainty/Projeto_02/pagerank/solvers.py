@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from pagerank import (DAMPING, DIRECT_LIMIT, SOLVERS, TOLERANCE,
+                      cached_graph, distance, power_iteration)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare how fast and how accurately each PageRank "
+                    "solver ranks a corpus."
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--damping", type=float, default=DAMPING)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--solver", choices=SOLVERS, action="append",
+                        help="solver to run (default: all that apply)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="print the residual and time of every iteration")
+    args = parser.parse_args()
+
+    graph, _ = cached_graph(args.corpus)
+    if "direct" in (args.solver or []) and len(graph) > DIRECT_LIMIT:
+        parser.error(f"direct solver is limited to {DIRECT_LIMIT} pages, "
+                     f"but {args.corpus} has {len(graph)}")
+    solvers = args.solver or [
+        name for name in SOLVERS
+        if name != "direct" or len(graph) <= DIRECT_LIMIT
+    ]
+
+    # Measure every solver against an exact or much tighter solution
+    if len(graph) <= DIRECT_LIMIT:
+        reference, _ = SOLVERS["direct"](graph, args.damping)
+    else:
+        reference, _ = power_iteration(graph, args.damping,
+                                       tolerance=args.tolerance * 1e-4)
+
+    print(f"{'solver':<14}  {'iterations':>10}  {'seconds':>10}  "
+          f"{'residual':>10}  {'error':>10}")
+    for name in solvers:
+        telemetry = []
+
+        def record(iteration, residual, seconds):
+            telemetry.append((iteration, residual, seconds))
+            if args.verbose:
+                print(f"  {name} {iteration:>5}: residual {residual:.3e} "
+                      f"in {seconds * 1000:.3f} ms")
+
+        start = time.perf_counter()
+        ranks, iterations = SOLVERS[name](graph, args.damping,
+                                          tolerance=args.tolerance,
+                                          callback=record)
+        seconds = time.perf_counter() - start
+        print(f"{name:<14}  {iterations:>10}  {seconds:>10.4f}  "
+              f"{telemetry[-1][1]:>10.2e}  {distance(ranks, reference):>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
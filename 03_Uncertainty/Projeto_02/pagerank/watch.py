@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+
+import numpy
+
+from pagerank import DAMPING, LinkGraph, extract_links, power_iteration
+
+INTERVAL = 1
+TOP = 10
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python watch.py corpus [interval]")
+    interval = float(sys.argv[2]) if len(sys.argv) == 3 else INTERVAL
+
+    ranker = IncrementalPageRank(sys.argv[1], DAMPING)
+    print(f"Ranked {len(ranker.pages)} pages in {ranker.iterations} "
+          f"iterations ({ranker.seconds:.3f}s)")
+    report(ranker.pages, ranker.ranks)
+
+    # Poll the directory and rerank whenever its pages change
+    while True:
+        time.sleep(interval)
+        added, removed, changed = ranker.update()
+        if added or removed or changed:
+            print(f"{len(added)} added, {len(removed)} removed, "
+                  f"{len(changed)} changed: reranked in {ranker.iterations} "
+                  f"iterations ({ranker.seconds:.3f}s)")
+            report(ranker.pages, ranker.ranks)
+
+
+class IncrementalPageRank():
+    """
+    PageRank of a directory of HTML pages, kept up to date as pages are
+    added, removed or changed.
+
+    The links are kept in compressed sparse row form like a LinkGraph,
+    and only the rows of pages that were added or changed are read and
+    replaced. Power iteration starts from the previous ranks, so small
+    edits converge in a few iterations instead of a full run.
+    """
+
+    def __init__(self, directory, damping_factor):
+        self.directory = directory
+        self.damping_factor = damping_factor
+
+        # Modification time and size of each page when it was last read
+        self.files = dict()
+
+        # Pages in graph order, their numbers, and the links between them
+        self.pages = []
+        self.ids = dict()
+        self.offsets = numpy.zeros(1, dtype=numpy.int64)
+        self.targets = numpy.zeros(0, dtype=numpy.int64)
+
+        # Addresses of missing pages linked to by each page that has any,
+        # which start to count as soon as those pages are added
+        self.unresolved = dict()
+
+        # Current ranks in graph order, and the cost of computing them
+        self.ranks = numpy.zeros(0)
+        self.iterations = 0
+        self.seconds = 0
+
+        self.update()
+
+    def scan(self):
+        """Returns the modification time and size of each page."""
+        files = dict()
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".html"):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def update(self):
+        """
+        Reads the pages added or changed since the last update, and
+        reranks the pages if any links changed.
+
+        Returns a tuple (added, removed, changed) of sets of pages.
+        """
+        files = self.scan()
+        added = files.keys() - self.files.keys()
+        removed = self.files.keys() - files.keys()
+        changed = {
+            page for page in files.keys() & self.files.keys()
+            if files[page] != self.files[page]
+        }
+        self.files = files
+
+        if removed:
+            self.remove(removed)
+        for page in sorted(added):
+            self.ids[page] = len(self.pages)
+            self.pages.append(page)
+        self.offsets = numpy.concatenate((
+            self.offsets, numpy.full(len(added), self.offsets[-1])
+        ))
+        self.ranks = numpy.concatenate((
+            self.ranks, numpy.full(len(added), 1 / len(self.pages))
+        ))
+
+        # New links of the pages that were added or changed
+        rows = dict()
+        read = added | changed
+        for page in read:
+            links = extract_links(os.path.join(self.directory, page))
+            links.discard(page)
+            self.unresolved.pop(page, None)
+            missing = {link for link in links if link not in self.ids}
+            if missing:
+                self.unresolved[page] = missing
+            row = sorted(map(self.ids.__getitem__, links - missing))
+            if not numpy.array_equal(row, self.links(self.ids[page])):
+                rows[self.ids[page]] = row
+
+        # Links from other pages to the pages just added now count
+        for page, missing in list(self.unresolved.items()):
+            found = missing & added
+            if found and page not in read:
+                missing -= found
+                if not missing:
+                    del self.unresolved[page]
+                rows[self.ids[page]] = sorted(
+                    [*self.links(self.ids[page]).tolist(),
+                     *map(self.ids.__getitem__, found)]
+                )
+
+        if rows:
+            self.replace_rows(rows)
+        if added or removed or rows:
+            self.rank()
+        return added, removed, changed
+
+    def links(self, page):
+        """Returns the numbers of the pages linked to by page `page`."""
+        return self.targets[self.offsets[page]:self.offsets[page + 1]]
+
+    def replace_rows(self, rows):
+        """
+        Replaces the links of each page number in `rows` with the sorted
+        page numbers it maps to, copying the other rows in slices.
+        """
+        degrees = numpy.diff(self.offsets)
+        pieces = []
+        previous = 0
+        for page in sorted(rows):
+            pieces.append(self.targets[self.offsets[previous]:
+                                       self.offsets[page]])
+            pieces.append(numpy.array(rows[page], dtype=numpy.int64))
+            degrees[page] = len(rows[page])
+            previous = page + 1
+        pieces.append(self.targets[self.offsets[previous]:])
+        self.targets = numpy.concatenate(pieces)
+        self.offsets = numpy.concatenate(([0], numpy.cumsum(degrees)))
+
+    def remove(self, removed):
+        """
+        Removes pages and renumbers the rest. Links to removed pages are
+        kept as unresolved, so they count again if the pages come back.
+        """
+        n = len(self.pages)
+        gone = numpy.zeros(n, dtype=bool)
+        gone[[self.ids[page] for page in removed]] = True
+        degrees = numpy.diff(self.offsets)
+        sources = numpy.repeat(numpy.arange(n), degrees)
+
+        # Remember which remaining pages linked to a removed one
+        dropped = gone[self.targets]
+        for source, target in zip(sources[dropped].tolist(),
+                                  self.targets[dropped].tolist()):
+            if not gone[source]:
+                self.unresolved.setdefault(
+                    self.pages[source], set()).add(self.pages[target])
+        for page in removed:
+            self.unresolved.pop(page, None)
+
+        # Drop the removed pages' rows and the links to them, and shift
+        # the numbers of the pages after them down
+        kept = ~gone[sources] & ~dropped
+        numbers = numpy.cumsum(~gone) - 1
+        self.targets = numbers[self.targets[kept]]
+        self.offsets = numpy.concatenate(([0], numpy.cumsum(
+            numpy.bincount(sources[kept], minlength=n)[~gone])))
+        self.ranks = self.ranks[~gone]
+        self.pages = [page for page in self.pages if page not in removed]
+        self.ids = {page: i for i, page in enumerate(self.pages)}
+
+    def rank(self):
+        """Ranks the pages, starting from their previous ranks."""
+        start = time.perf_counter()
+        if not self.pages:
+            self.ranks = numpy.zeros(0)
+            return
+        graph = LinkGraph(self.pages, self.offsets, self.targets)
+        self.ranks, self.iterations = power_iteration(
+            graph, self.damping_factor, ranks=self.ranks / self.ranks.sum()
+        )
+        self.seconds = time.perf_counter() - start
+
+
+def report(pages, ranks):
+    """Prints the highest ranked pages."""
+    for page in numpy.argsort(-ranks, kind="stable")[:TOP].tolist():
+        print(f"  {pages[page]}: {ranks[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()